@@ -1,18 +1,36 @@
 from __future__ import annotations
 
 import asyncio
+import concurrent.futures
 import logging
 import uuid
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Any
 
 from celery import Celery
+from celery.exceptions import Reject
+from celery.signals import worker_process_init, worker_process_shutdown, worker_ready, worker_shutting_down
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.app.config import settings
 from backend.app.db import AIJob, JobStatus
+from backend.common.batching import MicroBatcher
+from backend.common.cancellation import CancellationWatcher, JobCancelled
+from backend.common.deadlines import DEADLINE_ERROR, expire_job, is_expired, record_expired
 from backend.common.dlq import write_dead_letter
+from backend.common.lanes import lane_queues, observe_queue_wait
+from backend.common.events import AI, publish_job_event
+from backend.common.fair_scheduler import FairScheduler
+from backend.common.heartbeat import HeartbeatPublisher
+from backend.common.leases import Lease, LeaseKeeper, StaleLeaseError, claim, complete_many, release
+from backend.common.metrics import timed
+from backend.common.progress import ProgressReporter, read_progress
+from backend.common.result_cache import cache_scope, put_result, result_cache_key
+from backend.common.retry_policy import JobNotFound, policy_for
+from backend.common.throughput import record_throughput
+from backend.common.worker_runtime import WorkerRuntime
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("hivesync.ai_worker")
@@ -29,20 +47,129 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    # Tier lanes, dequeued by weighted fair order (see common/lanes.py)
+    task_queues=lane_queues(settings.WORKER_AI_QUEUE),
+    broker_transport_options={"queue_order_strategy": "backend.common.lanes:WeightedLaneCycle"},
+    # In async mode (--pool=threads) each thread reserves exactly one message.
+    worker_prefetch_multiplier=1,
 )
 
-engine = create_async_engine(settings.database_url, pool_pre_ping=True)
-SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+# One event loop + warm DB/Redis pools per worker process (see WorkerRuntime)
+runtime = WorkerRuntime("ai")
+
+# Interrupts running jobs when their owner cancels them (see common/cancellation.py)
+cancellations = CancellationWatcher(AI)
+runtime.add_background(lambda rt: cancellations.run_forever(rt.redis))
+
+# AI jobs are I/O-bound. Run the worker with `--pool=threads --concurrency=N`
+# and every thread hands its job to the shared loop, so one process runs up to
+# AI_WORKER_MAX_CONCURRENT_JOBS jobs at once, served round-robin by job_type.
+scheduler = FairScheduler(
+    "ai_jobs",
+    max_concurrent=settings.AI_WORKER_MAX_CONCURRENT_JOBS,
+    max_per_key=settings.AI_WORKER_MAX_PER_JOB_TYPE,
+)
+
+
+@dataclass
+class BatchItem:
+    lease: Lease
+    keeper: LeaseKeeper
+    payload: dict[str, Any]
+    progress: ProgressReporter
+
+
+def _batch_limits(job_type: str) -> tuple[int, float]:
+    size = settings.AI_BATCH_MAX_SIZE.get(job_type, settings.AI_BATCH_DEFAULT_MAX_SIZE)
+    linger_ms = settings.AI_BATCH_LINGER_MS.get(job_type, settings.AI_BATCH_DEFAULT_LINGER_MS)
+    return max(1, min(size, settings.AI_BATCH_COMPLETE_MAX_SIZE)), linger_ms / 1000
+
+
+async def _run_batch(job_type: str, items: list[BatchItem]) -> list[Any]:
+    """One model call for the whole batch, then one fenced UPDATE for all of its rows."""
+    # Replace with a real batched AI call later
+    await asyncio.sleep(1)
+    finished_at = utcnow()
+    results = [
+        {
+            "job_type": job_type,
+            "summary": "AI job completed successfully",
+            "selection": item.payload.get("selection"),
+            "finished_at": finished_at.isoformat(),
+        }
+        for item in items
+    ]
+
+    for item in items:
+        await item.keeper.stop()
+    async with runtime.session() as session:
+        written = await complete_many(
+            session,
+            AIJob,
+            [
+                (item.lease, {"result": result, "progress": item.progress.finish()})
+                for item, result in zip(items, results)
+            ],
+            status=JobStatus.succeeded,
+            completed_at=finished_at,
+        )
+    # Rows that were cancelled or re-claimed meanwhile keep their newer state
+    return [
+        result
+        if item.lease.row.id in written
+        else StaleLeaseError(f"ai_jobs {item.lease.row.id}: fencing token {item.lease.token} is stale")
+        for item, result in zip(items, results)
+    ]
+
+
+# Same-type jobs running on this process share model calls (see common/batching.py)
+batcher = MicroBatcher("ai_jobs", _run_batch, _batch_limits)
 
 WORKER_ID = f"ai-{uuid.uuid4()}"
-MAX_RETRIES = 3
-RETRY_DELAYS_SECONDS = [5, 20, 60]
+
+heartbeats = HeartbeatPublisher(
+    "ai",
+    WORKER_ID,
+    metadata=lambda: {
+        "active": scheduler.active,
+        "waiting": scheduler.waiting,
+        "max_concurrent": settings.AI_WORKER_MAX_CONCURRENT_JOBS,
+        "batching": batcher.pending,
+    },
+)
+runtime.add_background(lambda rt: heartbeats.run_forever(rt.redis))
+retry_policy = policy_for(settings.WORKER_AI_QUEUE)
 
 
 def utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
+@worker_shutting_down.connect
+def _cancel_inflight(**_: Any) -> None:
+    # Running jobs release their row and are requeued instead of finishing.
+    if runtime.started:
+        runtime.loop.call_soon_threadsafe(scheduler.cancel_all)
+
+
+@worker_process_init.connect
+def _start_runtime(**_: Any) -> None:
+    # Prefork child: start now so heartbeats flow while idle
+    runtime.start()
+
+
+@worker_ready.connect
+def _start_runtime_inline(sender=None, **_: Any) -> None:
+    # threads/solo pools run tasks in the main process
+    if "prefork" not in type(getattr(sender, "pool", None)).__module__:
+        runtime.start()
+
+
+@worker_process_shutdown.connect
+def _shutdown_runtime(**_: Any) -> None:
+    runtime.shutdown()
+
+
 @celery_app.task(name="hivesync.ai.run", bind=True, acks_late=True)
 def run_ai_job(self, **payload: Any):
     job_id = payload.get("job_id")
@@ -50,59 +177,114 @@ def run_ai_job(self, **payload: Any):
         logger.error("Missing job_id in payload")
         return
 
+    if not self.request.retries:
+        observe_queue_wait("ai", payload)
+        # Awaited, so this delivery's own failure can spend what it earned
+        runtime.run(retry_policy.deposit(runtime.redis))
+
+    if is_expired(payload):
+        # Past its deadline: don't claim, don't run, don't retry
+        record_expired("ai", payload)
+        runtime.spawn(record_throughput(runtime.redis, "ai"))
+        logger.info("AIJob %s missed its deadline (%s); dropping", job_id, payload.get("deadline_at"))
+        runtime.run(_expire_job(job_id))
+        return
+
+    job_type = payload.get("job_type") or "default"
     try:
-        asyncio.run(_run_ai_job_async(job_id, payload))
+        with timed("worker_task_seconds", task="hivesync.ai.run"):
+            runtime.run(scheduler.run(job_type, lambda: _run_ai_job_async(job_id, payload)))
+    except concurrent.futures.CancelledError:
+        logger.info("AIJob %s cancelled by worker shutdown; requeueing", job_id)
+        raise Reject("worker shutting down", requeue=True)
+    except StaleLeaseError:
+        logger.warning("AIJob %s was claimed by another worker; dropping this delivery", job_id)
+        return
+    except JobCancelled:
+        logger.info("AIJob %s cancelled while running; slot released", job_id)
     except Exception as exc:
         attempt = int(getattr(self.request, "retries", 0)) + 1
-        if attempt <= MAX_RETRIES:
-            delay = RETRY_DELAYS_SECONDS[min(attempt - 1, len(RETRY_DELAYS_SECONDS) - 1)]
-            logger.exception("AIJob %s failed (attempt %s/%s), retrying in %ss", job_id, attempt, MAX_RETRIES, delay)
-            raise self.retry(exc=exc, countdown=delay, max_retries=MAX_RETRIES)
+        decision = runtime.run(retry_policy.decide(runtime.redis, exc, attempt))
+        if decision.retry:
+            logger.exception(
+                "AIJob %s failed (attempt %s/%s), retrying in %.1fs",
+                job_id, attempt, retry_policy.max_retries, decision.delay,
+            )
+            raise self.retry(exc=exc, countdown=decision.delay, max_retries=retry_policy.max_retries)
 
-        logger.exception("AIJob %s failed permanently after %s attempts", job_id, attempt)
-        asyncio.run(_final_fail_to_dlq(job_id, payload, exc, attempts=attempt))
+        logger.exception("AIJob %s failed after %s attempts (%s); sending to DLQ", job_id, attempt, decision.reason)
+        runtime.run(_final_fail_to_dlq(job_id, payload, exc, attempts=attempt))
         celery_app.send_task(
             "hivesync.dlq.recorded",
             kwargs={"kind": "ai", "job_id": job_id},
             queue=settings.WORKER_DLQ_QUEUE,
         )
 
+    # Feeds the API's admission estimate (backlog / throughput). Only outcomes
+    # that take the job off the queue count; retries and requeues don't.
+    runtime.spawn(record_throughput(runtime.redis, "ai"))
 
-async def _run_ai_job_async(job_id: str, payload: dict[str, Any]):
-    async with SessionLocal() as session:
-        job = await _get_job(session, job_id)
-        if not job:
-            raise RuntimeError(f"AIJob not found: {job_id}")
 
-        if job.status in {JobStatus.succeeded, JobStatus.failed, JobStatus.cancelled}:
-            logger.info("AIJob %s already terminal (%s); skipping", job_id, job.status)
+async def _run_ai_job_async(job_id: str, payload: dict[str, Any]):
+    async with runtime.session() as session:
+        lease = await claim(
+            session, AIJob, _job_id_clause(job_id), owner=WORKER_ID, seconds=settings.AI_JOB_LEASE_SECONDS
+        )
+        if lease is None:
+            job = await _get_job(session, job_id)
+            if not job:
+                raise JobNotFound(f"AIJob not found: {job_id}")
+            # Terminal, or running under another worker's live lease (duplicate delivery)
+            logger.info("AIJob %s not claimable (%s); skipping", job_id, job.status)
             return
+    job = lease.row
+    await publish_job_event(runtime.redis, AI, job_id, "status", status=JobStatus.running.value)
 
-        job.status = JobStatus.running
-        await session.commit()
+    try:
+        async with (
+            LeaseKeeper(runtime.session, lease) as keeper,
+            cancellations.watch(runtime.redis, job_id),
+            ProgressReporter(runtime.redis, AI, job_id) as progress,
+        ):
+            progress.update(0, stage="running")
+            # Completes the row as part of its batch
+            result = await batcher.submit(job.job_type, BatchItem(lease, keeper, payload, progress))
+    except (Exception, asyncio.CancelledError) as exc:
+        if not isinstance(exc, (StaleLeaseError, JobCancelled)):
+            # Hand the row back so a retry or redelivery can claim it.
+            async with runtime.session() as session:
+                if await release(session, lease):
+                    await publish_job_event(runtime.redis, AI, job_id, "status", status=JobStatus.queued.value)
+        raise
 
-        # Replace with real AI execution later
-        await asyncio.sleep(1)
+    await put_result(
+        runtime.redis,
+        result_cache_key(
+            cache_scope(job.team_id, job.user_id), job.job_type, payload.get("selection"), payload.get("project_id")
+        ),
+        result,
+    )
+    await publish_job_event(runtime.redis, AI, job_id, "status", status=JobStatus.succeeded.value, result=result)
 
-        job.status = JobStatus.succeeded
-        job.result = {
-            "job_type": job.job_type,
-            "summary": "AI job completed successfully",
-            "selection": payload.get("selection"),
-            "finished_at": utcnow().isoformat(),
-        }
-        job.completed_at = utcnow()
-        await session.commit()
+
+async def _expire_job(job_id: str) -> None:
+    async with runtime.session() as session:
+        if await expire_job(session, AIJob, _job_id_clause(job_id)):
+            await publish_job_event(
+                runtime.redis, AI, job_id, "status", status=JobStatus.failed.value, error=DEADLINE_ERROR
+            )
 
 
 async def _final_fail_to_dlq(job_id: str, payload: dict[str, Any], exc: Exception, attempts: int) -> None:
-    async with SessionLocal() as session:
+    async with runtime.session() as session:
         job = await _get_job(session, job_id)
-        if job:
+        if job and job.status in {JobStatus.queued, JobStatus.running}:
             job.status = JobStatus.failed
             job.error = f"{type(exc).__name__}: {exc}"
             job.completed_at = utcnow()
+            job.progress = await read_progress(runtime.redis, AI, job_id)
             await session.commit()
+            await publish_job_event(runtime.redis, AI, job_id, "status", status=JobStatus.failed.value, error=job.error)
 
         await write_dead_letter(
             session,
@@ -117,15 +299,15 @@ async def _final_fail_to_dlq(job_id: str, payload: dict[str, Any], exc: Exceptio
         )
 
 
-async def _get_job(session: AsyncSession, job_id: str) -> AIJob | None:
+def _job_id_clause(job_id: str):
     # Accept string UUID
     try:
         uid = uuid.UUID(job_id)
     except Exception:
         uid = None
+    return AIJob.id == (uid if uid else job_id)
 
-    if uid:
-        res = await session.execute(select(AIJob).where(AIJob.id == uid))
-    else:
-        res = await session.execute(select(AIJob).where(AIJob.id == job_id))
+
+async def _get_job(session: AsyncSession, job_id: str) -> AIJob | None:
+    res = await session.execute(select(AIJob).where(_job_id_clause(job_id)))
     return res.scalar_one_or_none()
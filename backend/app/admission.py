@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from backend.common.lanes import lane_queue
+from backend.common.metrics import registry
+from backend.common.throughput import read_throughput
+
+from .config import settings
+from .db import Tier
+
+logger = logging.getLogger("hivesync.admission")
+
+# Admission control for preview / AI job creation.
+#
+# Estimated wait = backlog across every lane of the kind's queue divided by
+# recent cluster throughput. Each tier has its own wait ceiling (Free lowest),
+# so as the backlog grows Free is shed first, then Pro, then Premium. Admin is
+# never shed. Redis reads are cached per kind for a second.
+
+
+@dataclass
+class QueueEstimate:
+    depth: int
+    throughput: float
+    wait_seconds: float
+    at: float
+
+
+class AdmissionController:
+    def __init__(self):
+        self._estimates: dict[str, QueueEstimate] = {}
+
+    @staticmethod
+    def _base_queue(kind: str) -> str:
+        return settings.WORKER_PREVIEW_QUEUE if kind == "preview" else settings.WORKER_AI_QUEUE
+
+    async def estimate(self, redis_client, kind: str) -> QueueEstimate:
+        cached = self._estimates.get(kind)
+        now = time.monotonic()
+        if cached and now - cached.at < settings.ADMISSION_ESTIMATE_TTL_SECONDS:
+            return cached
+
+        base = self._base_queue(kind)
+        pipe = redis_client.pipeline(transaction=False)
+        for q in {base, *(lane_queue(base, t) for t in Tier)}:
+            pipe.llen(q)
+        depth = sum(await pipe.execute())
+        throughput = await read_throughput(redis_client, kind, settings.ADMISSION_THROUGHPUT_WINDOW_SECONDS)
+
+        if depth < settings.ADMISSION_MIN_DEPTH:
+            wait = 0.0
+        elif throughput > 0:
+            wait = depth / throughput
+        else:
+            # Backlog and nothing draining it
+            wait = math.inf
+
+        est = QueueEstimate(depth=depth, throughput=throughput, wait_seconds=wait, at=now)
+        self._estimates[kind] = est
+        registry.set_gauge("admission_estimated_wait_seconds", min(wait, 1e9), kind=kind)
+        return est
+
+    async def check(self, redis_client, kind: str, tier: Tier) -> None:
+        """Raise 429 with Retry-After if this tier should be shed right now."""
+        if not settings.ADMISSION_ENABLED:
+            return
+        ceiling: Optional[float] = settings.ADMISSION_MAX_WAIT_SECONDS.get(Tier(tier).value)
+        if ceiling is None:
+            return
+
+        try:
+            est = await self.estimate(redis_client, kind)
+        except Exception:
+            # Fail open: losing Redis must not stop job creation.
+            logger.warning("Admission estimate unavailable for %s", kind, exc_info=True)
+            return
+        if est.wait_seconds <= ceiling:
+            return
+
+        excess = est.wait_seconds - ceiling
+        retry_after = settings.ADMISSION_MAX_RETRY_AFTER_SECONDS if math.isinf(excess) else excess
+        retry_after = int(max(1, min(settings.ADMISSION_MAX_RETRY_AFTER_SECONDS, math.ceil(retry_after))))
+
+        dry_run = settings.ADMISSION_DRY_RUN
+        registry.inc("admission_shed_total", kind=kind, tier=Tier(tier).value, dry_run=str(dry_run).lower())
+        logger.warning(
+            "%sShedding %s %s request: depth=%s throughput=%.2f/s est_wait=%.0fs ceiling=%.0fs",
+            "[dry-run] " if dry_run else "", Tier(tier).value, kind,
+            est.depth, est.throughput, est.wait_seconds, ceiling,
+        )
+        if dry_run:
+            return
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"{kind} workers are overloaded, retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+admission = AdmissionController()
@@ -4,8 +4,10 @@ import base64
 import hashlib
 import hmac
 import secrets
+import threading
 import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Any, Optional
 
@@ -45,6 +47,67 @@ def _jwt_decode(token: str, secret: str) -> dict[str, Any]:
     return jwt.decode(token, secret, algorithms=["HS256"])
 
 
+class VerifiedTokenCache:
+    """
+    Bounded LRU of already-verified JWT claims, keyed by a digest of the token.
+    Entries never outlive the token's own `exp` (nor `max_ttl_seconds`), so a
+    hit is exactly as valid as a fresh HMAC check would be.
+    """
+
+    def __init__(self, max_entries: int, max_ttl_seconds: int):
+        self.max_entries = max_entries
+        self.max_ttl_seconds = max_ttl_seconds
+        self._entries: OrderedDict[bytes, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(namespace: str, token: str) -> bytes:
+        return hashlib.sha256(f"{namespace}:{token}".encode("utf-8")).digest()
+
+    def get(self, namespace: str, token: str) -> Optional[dict[str, Any]]:
+        key = self._key(namespace, token)
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return None
+            expires_at, payload = hit
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return dict(payload)
+
+    def put(self, namespace: str, token: str, payload: dict[str, Any]) -> None:
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)) or self.max_entries <= 0:
+            return
+        expires_at = min(float(exp), time.time() + self.max_ttl_seconds)
+        key = self._key(namespace, token)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(payload))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = VerifiedTokenCache(
+    max_entries=settings.TOKEN_CACHE_MAX_ENTRIES,
+    max_ttl_seconds=settings.TOKEN_CACHE_MAX_TTL_SECONDS,
+)
+
+
+def _jwt_decode_cached(token: str, secret: str, namespace: str) -> dict[str, Any]:
+    payload = token_cache.get(namespace, token)
+    if payload is None:
+        payload = _jwt_decode(token, secret)
+        token_cache.put(namespace, token, payload)
+    return payload
+
+
 def create_access_token(user_id: str, tier: Tier) -> str:
     now = utcnow()
     payload = {
@@ -72,7 +135,7 @@ def hash_refresh_token(token: str) -> str:
 
 
 def decode_access_token(token: str) -> dict[str, Any]:
-    payload = _jwt_decode(token, settings.JWT_SECRET)
+    payload = _jwt_decode_cached(token, settings.JWT_SECRET, "access")
     if payload.get("type") != "access":
         raise JWTError("Invalid token type")
     return payload
@@ -96,7 +159,7 @@ def create_preview_token(preview_id: str, user_id: str, device_id: str, expires_
 
 
 def verify_preview_token(token: str) -> dict[str, Any]:
-    payload = _jwt_decode(token, settings.PREVIEW_TOKEN_SECRET)
+    payload = _jwt_decode_cached(token, settings.PREVIEW_TOKEN_SECRET, "preview")
     if payload.get("type") != "preview":
         raise JWTError("Invalid token type")
     return payload
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import redis.asyncio as redis
+
+from backend.common.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+MISS = object()
+
+# KEYS[1] value key, KEYS[2] generation key; ARGV: generation seen before the load, value, ttl
+SET_IF_GENERATION_LUA = """
+local gen = redis.call('GET', KEYS[2]) or '0'
+if gen ~= ARGV[1] then
+  return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+_caches: dict[str, "TwoLevelCache"] = {}
+
+
+class TwoLevelCache:
+    """
+    In-process LRU with TTL in front of a shared Redis copy.
+
+    Values must be JSON-serialisable. Invalidation deletes the Redis copy,
+    bumps the key's generation and broadcasts on INVALIDATION_CHANNEL so every
+    API process drops its local entry; the local TTL bounds staleness if a
+    broadcast is missed.
+
+    Read-through fills take fill_token() before loading from the database and
+    pass it to set(): a fill whose key was invalidated in between is dropped,
+    so a slow reader can't put the pre-invalidation value back.
+    """
+
+    def __init__(self, name: str, *, local_ttl: float, redis_ttl: int, max_entries: int):
+        self.name = name
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self.max_entries = max_entries
+        self._local: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._redis: Optional[redis.Redis] = None
+        # Bumped on every local drop; a fill token from before a drop can't fill locally
+        self._local_epoch = 0
+        _caches[name] = self
+
+    def attach(self, client: redis.Redis) -> None:
+        self._redis = client
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.name}:{key}"
+
+    def _generation_key(self, key: str) -> str:
+        return f"cache:{self.name}:gen:{key}"
+
+    def get_local(self, key: str) -> Any:
+        hit = self._local.get(key)
+        if hit is None:
+            return MISS
+        expires_at, value = hit
+        if expires_at < time.monotonic():
+            self._local.pop(key, None)
+            return MISS
+        self._local.move_to_end(key)
+        return value
+
+    def set_local(self, key: str, value: Any) -> None:
+        self._local[key] = (time.monotonic() + self.local_ttl, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    def drop_local(self, key: str) -> None:
+        self._local_epoch += 1
+        self._local.pop(key, None)
+
+    def clear_local(self) -> None:
+        self._local_epoch += 1
+        self._local.clear()
+
+    async def get(self, key: str) -> Any:
+        value = self.get_local(key)
+        if value is not MISS:
+            registry.inc("cache_hits_total", cache=self.name, level="local")
+            return value
+
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(self._redis_key(key))
+            except Exception:
+                logger.warning("cache %s: redis get failed", self.name, exc_info=True)
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self.set_local(key, value)
+                registry.inc("cache_hits_total", cache=self.name, level="redis")
+                return value
+
+        registry.inc("cache_misses_total", cache=self.name)
+        return MISS
+
+    async def fill_token(self, key: str) -> tuple[int, Any]:
+        """Take before loading the value to set(); see the class docstring."""
+        generation: Any = "0"
+        if self._redis is not None:
+            try:
+                generation = await self._redis.get(self._generation_key(key)) or "0"
+            except Exception:
+                logger.warning("cache %s: redis generation read failed", self.name, exc_info=True)
+                generation = None
+        return self._local_epoch, generation
+
+    async def set(self, key: str, value: Any, token: Optional[tuple[int, Any]] = None) -> None:
+        """Without a token the value is authoritative (e.g. just written by this request)."""
+        if token is None:
+            self.set_local(key, value)
+            if self._redis is not None:
+                try:
+                    await self._redis.set(self._redis_key(key), json.dumps(value), ex=self.redis_ttl)
+                except Exception:
+                    logger.warning("cache %s: redis set failed", self.name, exc_info=True)
+            return
+
+        epoch, generation = token
+        if self._redis is not None:
+            if generation is None:
+                return
+            try:
+                filled = await self._redis.eval(
+                    SET_IF_GENERATION_LUA,
+                    2,
+                    self._redis_key(key),
+                    self._generation_key(key),
+                    generation,
+                    json.dumps(value),
+                    self.redis_ttl,
+                )
+            except Exception:
+                logger.warning("cache %s: redis set failed", self.name, exc_info=True)
+                return
+            if not filled:
+                registry.inc("cache_stale_fills_total", cache=self.name)
+                return
+        if epoch == self._local_epoch:
+            self.set_local(key, value)
+
+    async def invalidate(self, key: str) -> None:
+        self.drop_local(key)
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                pipe.incr(self._generation_key(key))
+                pipe.expire(self._generation_key(key), self.redis_ttl)
+                pipe.delete(self._redis_key(key))
+                pipe.publish(INVALIDATION_CHANNEL, f"{self.name}|{key}")
+                await pipe.execute()
+            except Exception:
+                logger.warning("cache %s: redis invalidate failed", self.name, exc_info=True)
+
+
+def attach_caches(client: redis.Redis) -> None:
+    for cache in _caches.values():
+        cache.attach(client)
+
+
+async def listen_for_invalidations(client: redis.Redis) -> None:
+    """Drop local entries invalidated by other processes. Runs for the app lifetime."""
+    while True:
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            async for msg in pubsub.listen():
+                name, _, key = str(msg.get("data", "")).partition("|")
+                cache = _caches.get(name)
+                if cache is not None:
+                    cache.drop_local(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("cache invalidation listener failed; resubscribing", exc_info=True)
+            # Entries may have been invalidated while we were disconnected.
+            for cache in _caches.values():
+                cache.clear_local()
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
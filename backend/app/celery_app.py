@@ -29,5 +29,9 @@ celery_app.conf.beat_schedule = {
     "recovery-sweep-every-minute": {
         "task": "hivesync.recovery.sweep",
         "schedule": 60.0,
-    }
+    },
+    "preview-presence-flush": {
+        "task": "hivesync.presence.flush",
+        "schedule": float(settings.PREVIEW_PRESENCE_FLUSH_INTERVAL_SECONDS),
+    },
 }
\ No newline at end of file
@@ -59,6 +59,150 @@ class Settings(BaseSettings):
     # and also emitted here for optional manual consumers.
     WORKER_DLQ_QUEUE: str = "dlq_tasks"
 
+    # Per-tier priority lanes (<queue>.<tier>) dequeued by smooth weighted
+    # round-robin, so higher tiers go first but Free is never starved.
+    # SLOs are target queue waits, checked by workers and shown in the admin API.
+    TIER_LANES_ENABLED: bool = True
+    TIER_LANE_WEIGHTS: dict[str, int] = {"Admin": 8, "Premium": 8, "Pro": 4, "Free": 1}
+    TIER_QUEUE_SLO_SECONDS: dict[str, float] = {"Admin": 5.0, "Premium": 5.0, "Pro": 15.0, "Free": 60.0}
+
+    # Transactional outbox relay (Celery publishes happen off the request path)
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_RETRY_BACKOFF_SECONDS: float = 5.0
+    OUTBOX_RETENTION_HOURS: int = 24
+
+    # Worker retries: full-jitter exponential backoff, and a per-queue budget
+    # where each first delivery earns RATIO retry tokens. A reserve of
+    # RESERVE_TOKENS, refilled at MIN_PER_SECOND (but never past the reserve),
+    # keeps low-volume queues able to retry; at volume retries are capped at
+    # RATIO of deliveries. Permanent errors and budget exhaustion go to DLQ.
+    WORKER_MAX_RETRIES: int = 3
+    WORKER_RETRY_BASE_DELAY_SECONDS: float = 5.0
+    WORKER_RETRY_MAX_DELAY_SECONDS: float = 300.0
+    WORKER_RETRY_BUDGET_RATIO: float = 0.1
+    WORKER_RETRY_BUDGET_RESERVE_TOKENS: float = 10.0
+    WORKER_RETRY_BUDGET_MIN_PER_SECOND: float = 0.05
+    WORKER_RETRY_BUDGET_MAX_TOKENS: float = 100.0
+
+    # Bulk DLQ replay is paced by a token bucket so it can't re-flood workers
+    DLQ_REPLAY_RATE_PER_SECOND: float = 5.0
+    DLQ_REPLAY_BURST: int = 10
+    DLQ_REPLAY_MAX_ENTRIES: int = 10000
+
+    # Absolute task deadlines set at enqueue time; workers drop expired tasks
+    # without claiming them. Preview deadlines are also capped by token expiry.
+    PREVIEW_DEADLINE_SECONDS: dict[str, int] = {"Free": 600, "Pro": 900, "Premium": 900, "Admin": 900}
+    AI_JOB_DEADLINE_SECONDS: dict[str, int] = {"Free": 1800, "Pro": 3600, "Premium": 7200, "Admin": 7200}
+    AI_JOB_TYPE_DEADLINE_SECONDS: dict[str, int] = {}
+
+    # Admission control: new preview/AI work is rejected (429) once the
+    # estimated queue wait (backlog / recent throughput) passes the tier's
+    # ceiling. Tiers without a ceiling (Admin) are never shed. DRY_RUN only logs.
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_DRY_RUN: bool = False
+    ADMISSION_MAX_WAIT_SECONDS: dict[str, float] = {"Free": 120.0, "Pro": 300.0, "Premium": 900.0}
+    ADMISSION_MIN_DEPTH: int = 20
+    ADMISSION_THROUGHPUT_WINDOW_SECONDS: int = 60
+    ADMISSION_ESTIMATE_TTL_SECONDS: float = 1.0
+    ADMISSION_MAX_RETRY_AFTER_SECONDS: int = 300
+
+    # A running preview/AI job whose lease lapses is considered stuck.
+    PREVIEW_JOB_LEASE_SECONDS: int = 300
+    AI_JOB_LEASE_SECONDS: int = 600
+
+    # Recovery sweep: requeue stuck jobs (up to RECOVERY_MAX_REQUEUES times)
+    # instead of failing them; rows are processed in batches.
+    RECOVERY_REQUEUE_STUCK: bool = False
+    RECOVERY_MAX_REQUEUES: int = 2
+    RECOVERY_BATCH_SIZE: int = 1000
+
+    # Preview presence lives in Redis; a client counts as active if it beat
+    # within the window. Last-seen state is flushed to Postgres periodically.
+    PREVIEW_PRESENCE_WINDOW_SECONDS: int = 30
+    PREVIEW_PRESENCE_TTL_SECONDS: int = 600
+    PREVIEW_PRESENCE_FLUSH_INTERVAL_SECONDS: int = 15
+    PREVIEW_PRESENCE_FLUSH_BATCH_SIZE: int = 500
+
+    # Worker liveness: processes beat into Redis every INTERVAL; a worker is
+    # dead once its key is older than TTL. Postgres is updated by the recovery sweep.
+    WORKER_HEARTBEAT_INTERVAL_SECONDS: int = 10
+    WORKER_LIVENESS_TTL_SECONDS: int = 30
+    # Rows of workers that stopped beating are deleted after this long
+    WORKER_RETENTION_SECONDS: int = 86400
+
+    # Job progress: workers coalesce updates in memory and write them to Redis
+    # at most once per INTERVAL; only the final snapshot reaches Postgres.
+    JOB_PROGRESS_FLUSH_INTERVAL_SECONDS: float = 1.0
+    JOB_PROGRESS_TTL_SECONDS: int = 3600
+
+    # Per worker process (WorkerRuntime keeps one loop + pool for its lifetime)
+    WORKER_DB_POOL_SIZE: int = 5
+    WORKER_DB_MAX_OVERFLOW: int = 5
+
+    # AI worker async mode: jobs running concurrently on one process's loop,
+    # and an optional per-job_type cap (0 = none; dispatch is round-robin anyway)
+    AI_WORKER_MAX_CONCURRENT_JOBS: int = 64
+    AI_WORKER_MAX_PER_JOB_TYPE: int = 0
+
+    # Micro-batching of AI jobs running on one process: same-type jobs are run
+    # as one model call once MAX_SIZE have gathered or LINGER_MS has passed.
+    # A max size of 1 (the default) disables batching for that job_type.
+    # Batches are also bounded by the concurrency caps above.
+    AI_BATCH_DEFAULT_MAX_SIZE: int = 1
+    AI_BATCH_DEFAULT_LINGER_MS: int = 50
+    AI_BATCH_MAX_SIZE: dict[str, int] = {}
+    AI_BATCH_LINGER_MS: dict[str, int] = {}
+    # Completions landing together are written in one UPDATE of up to this many rows
+    AI_BATCH_COMPLETE_MAX_SIZE: int = 256
+
+    # Argon2 runs in a dedicated process pool; requests beyond
+    # workers + queue_max are rejected with 503 instead of piling up.
+    AUTH_HASH_WORKERS: int = 2
+    AUTH_HASH_QUEUE_MAX: int = 32
+    AUTH_HASH_RETRY_AFTER_SECONDS: int = 1
+
+    # Verified JWT claims cache (access + preview tokens). Entries also
+    # expire at the token's own exp.
+    TOKEN_CACHE_MAX_ENTRIES: int = 50000
+    TOKEN_CACHE_MAX_TTL_SECONDS: int = 900
+
+    # Authenticated principal cache (get_current_user): local LRU + Redis.
+    PRINCIPAL_CACHE_LOCAL_TTL_SECONDS: int = 30
+    PRINCIPAL_CACHE_REDIS_TTL_SECONDS: int = 300
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+
+    # Team membership/role cache (require_team_role) and the immutable
+    # task -> project -> team ancestry map.
+    AUTHZ_CACHE_LOCAL_TTL_SECONDS: int = 30
+    AUTHZ_CACHE_REDIS_TTL_SECONDS: int = 600
+    AUTHZ_CACHE_MAX_ENTRIES: int = 50000
+    ANCESTRY_CACHE_LOCAL_TTL_SECONDS: int = 300
+    ANCESTRY_CACHE_REDIS_TTL_SECONDS: int = 86400
+
+    # Per-route, per-tier limits live in rate_limit.RATE_LIMIT_RULES.
+    RATE_LIMIT_ENABLED: bool = True
+    # "redis": one script call per request. "hybrid": local token leases that
+    # refill from Redis; bigger/longer leases = fewer round trips, looser limits.
+    RATE_LIMIT_MODE: str = "redis"
+    RATE_LIMIT_LEASE_SIZE: int = 10
+    RATE_LIMIT_LEASE_TTL_MS: int = 1000
+    RATE_LIMIT_LEASE_MAX_FRACTION: float = 0.1
+
+    # Content-addressed AI results (job_type, selection, project_id); oldest
+    # entries are evicted beyond MAX_ENTRIES.
+    AI_RESULT_CACHE_ENABLED: bool = True
+    AI_RESULT_CACHE_TTL_SECONDS: int = 86400
+    AI_RESULT_CACHE_MAX_ENTRIES: int = 100000
+
+    # Idempotency-Key on create endpoints: how long a response is replayable,
+    # how long an in-flight claim lives, and how long a duplicate waits on it.
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_PENDING_TTL_SECONDS: int = 60
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+
+    METRICS_PUBLISH_INTERVAL_SECONDS: int = 15
+
     LOG_LEVEL: str = "info"
     SENTRY_DSN: Optional[str] = None
 
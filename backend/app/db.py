@@ -7,7 +7,7 @@ from typing import Any, Optional
 
 from sqlalchemy import (
     String, DateTime, Enum, Boolean, ForeignKey, UniqueConstraint, Index,
-    JSON, Text, Integer
+    JSON, Text, Integer, text
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
@@ -152,11 +152,30 @@ class PreviewSession(Base):
     team_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("teams.id", ondelete="SET NULL"), nullable=True)
     project_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="SET NULL"), nullable=True)
     device_id: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    # Client-supplied content revision (e.g. commit or bundle hash) used to coalesce identical builds
+    revision: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
     status: Mapped[JobStatus] = mapped_column(Enum(JobStatus), default=JobStatus.queued, index=True)
     tier_snapshot: Mapped[Tier] = mapped_column(Enum(Tier), default=Tier.Free, index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    lease_owner: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    fencing_token: Mapped[int] = mapped_column(Integer, default=0)
+    recovery_count: Mapped[int] = mapped_column(Integer, default=0)
     completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Written behind from Redis presence (see app/presence.py)
+    last_seen_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    active_clients: Mapped[int] = mapped_column(Integer, default=0)
+    # Final progress snapshot; live progress is in Redis (see common/progress.py)
+    progress: Mapped[Optional[dict[str, Any]]] = mapped_column(JSON, nullable=True)
+    # Fixed at first enqueue; see common/deadlines.py
+    deadline_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_preview_sessions_status_lease", "status", "lease_expires_at"),
+        Index("ix_preview_sessions_device_status", "project_id", "device_id", "status"),
+    )
 
 
 class AIJob(Base):
@@ -172,8 +191,17 @@ class AIJob(Base):
     params: Mapped[dict[str, Any]] = mapped_column(JSON, default=dict)
     result: Mapped[Optional[dict[str, Any]]] = mapped_column(JSON, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    lease_owner: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    fencing_token: Mapped[int] = mapped_column(Integer, default=0)
+    recovery_count: Mapped[int] = mapped_column(Integer, default=0)
     completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    progress: Mapped[Optional[dict[str, Any]]] = mapped_column(JSON, nullable=True)
+    deadline_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (Index("ix_ai_jobs_status_lease", "status", "lease_expires_at"),)
 
 
 class Worker(Base):
@@ -246,9 +274,41 @@ class DeadLetter(Base):
     error_type: Mapped[str] = mapped_column(String(120))
     error_message: Mapped[str] = mapped_column(Text)
 
+    # sha256 of task_name + error_type + normalized message, for grouping
+    fingerprint: Mapped[Optional[str]] = mapped_column(String(64), index=True, nullable=True)
+
     payload: Mapped[dict[str, Any]] = mapped_column(JSON, default=dict)
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+    requeued_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class OutboxMessage(Base):
+    """
+    Transactional outbox: Celery tasks written in the same transaction as the
+    row they act on, published asynchronously by the outbox relay.
+    """
+    __tablename__ = "outbox_messages"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    task_name: Mapped[str] = mapped_column(String(200))
+    queue: Mapped[str] = mapped_column(String(120))
+    kwargs: Mapped[dict[str, Any]] = mapped_column(JSON, default=dict)
+
+    # preview_id / ai job id, for lookups and revocation
+    correlation_id: Mapped[Optional[str]] = mapped_column(String(128), index=True, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+    available_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+    published_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_pending", "available_at", postgresql_where=text("published_at IS NULL")),
+        Index("ix_outbox_published_at", "published_at"),
+    )
 
 
 # Engine + session
@@ -256,7 +316,45 @@ engine = create_async_engine(settings.database_url, pool_pre_ping=True)
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
 
+# create_all only creates missing tables; columns and indexes added to existing
+# tables are applied here. Every statement is idempotent and runs on startup.
+SCHEMA_UPGRADES: list[str] = [
+    # Job leases and recovery
+    "ALTER TABLE preview_sessions ADD COLUMN IF NOT EXISTS started_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE preview_sessions ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE preview_sessions ADD COLUMN IF NOT EXISTS recovery_count INTEGER NOT NULL DEFAULT 0",
+    "CREATE INDEX IF NOT EXISTS ix_preview_sessions_status_lease ON preview_sessions (status, lease_expires_at)",
+    "ALTER TABLE ai_jobs ADD COLUMN IF NOT EXISTS started_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE ai_jobs ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE ai_jobs ADD COLUMN IF NOT EXISTS recovery_count INTEGER NOT NULL DEFAULT 0",
+    "CREATE INDEX IF NOT EXISTS ix_ai_jobs_status_lease ON ai_jobs (status, lease_expires_at)",
+    # Fencing tokens
+    "ALTER TABLE preview_sessions ADD COLUMN IF NOT EXISTS lease_owner VARCHAR(128)",
+    "ALTER TABLE preview_sessions ADD COLUMN IF NOT EXISTS fencing_token INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE ai_jobs ADD COLUMN IF NOT EXISTS lease_owner VARCHAR(128)",
+    "ALTER TABLE ai_jobs ADD COLUMN IF NOT EXISTS fencing_token INTEGER NOT NULL DEFAULT 0",
+    # Preview presence write-behind
+    "ALTER TABLE preview_sessions ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE preview_sessions ADD COLUMN IF NOT EXISTS active_clients INTEGER NOT NULL DEFAULT 0",
+    # Preview coalescing
+    "ALTER TABLE preview_sessions ADD COLUMN IF NOT EXISTS revision VARCHAR(128)",
+    "CREATE INDEX IF NOT EXISTS ix_preview_sessions_device_status ON preview_sessions (project_id, device_id, status)",
+    # DLQ grouping and replay
+    "ALTER TABLE dead_letters ADD COLUMN IF NOT EXISTS fingerprint VARCHAR(64)",
+    "ALTER TABLE dead_letters ADD COLUMN IF NOT EXISTS requeued_at TIMESTAMP WITH TIME ZONE",
+    "CREATE INDEX IF NOT EXISTS ix_dead_letters_fingerprint ON dead_letters (fingerprint)",
+    # Final job progress
+    "ALTER TABLE preview_sessions ADD COLUMN IF NOT EXISTS progress JSON",
+    "ALTER TABLE ai_jobs ADD COLUMN IF NOT EXISTS progress JSON",
+    # Request-relative task deadlines
+    "ALTER TABLE preview_sessions ADD COLUMN IF NOT EXISTS deadline_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE ai_jobs ADD COLUMN IF NOT EXISTS deadline_at TIMESTAMP WITH TIME ZONE",
+]
+
+
 async def init_db() -> None:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        for stmt in SCHEMA_UPGRADES:
+            await conn.execute(text(stmt))
 
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+import redis.asyncio as redis
+
+from backend.common.events import JOB_EVENTS_PATTERN
+from backend.common.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+SSE_KEEPALIVE_SECONDS = 15
+TERMINAL_STATUSES = {"succeeded", "failed", "cancelled"}
+
+
+class EventHub:
+    """
+    One Redis pattern subscription per API process, fanned out to in-process
+    subscriber queues keyed by channel. A slow client loses its oldest
+    events rather than blocking the others.
+    """
+
+    def __init__(self):
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(s) for s in self._subscribers.values())
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[asyncio.Queue]:
+        q: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(channel, set()).add(q)
+        registry.set_gauge("event_subscribers", self.subscriber_count)
+        try:
+            yield q
+        finally:
+            subs = self._subscribers.get(channel)
+            if subs is not None:
+                subs.discard(q)
+                if not subs:
+                    self._subscribers.pop(channel, None)
+            registry.set_gauge("event_subscribers", self.subscriber_count)
+
+    def _dispatch(self, channel: str, event: dict[str, Any]) -> None:
+        for q in self._subscribers.get(channel, ()):
+            if q.full():
+                q.get_nowait()
+                registry.inc("event_dropped_total")
+            q.put_nowait(event)
+
+    async def run_forever(self, client: redis.Redis) -> None:
+        while True:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(JOB_EVENTS_PATTERN)
+                async for msg in pubsub.listen():
+                    channel = msg.get("channel")
+                    if channel not in self._subscribers:
+                        continue
+                    try:
+                        event = json.loads(msg["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    self._dispatch(channel, event)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Job event subscription failed; resubscribing", exc_info=True)
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+
+hub = EventHub()
+
+
+def sse_format(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def sse_job_stream(
+    request,
+    channel: str,
+    load_snapshot: Callable[[], Awaitable[Optional[dict[str, Any]]]],
+) -> AsyncIterator[str]:
+    """
+    Server-sent events for one job: the current DB state first, then every
+    published transition until the job is terminal or the client goes away.
+    We subscribe before reading the snapshot so nothing falls in the gap.
+    """
+    async with hub.subscribe(channel) as q:
+        snapshot = await load_snapshot()
+        if snapshot is None:
+            return
+        yield sse_format("snapshot", snapshot)
+        if snapshot.get("status") in TERMINAL_STATUSES:
+            return
+
+        while True:
+            try:
+                event = await asyncio.wait_for(q.get(), timeout=SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield ": keepalive\n\n"
+                continue
+            yield sse_format(event.get("event", "message"), event)
+            if event.get("status") in TERMINAL_STATUSES:
+                return
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from backend.common.metrics import registry
+
+from .auth import hash_password, verify_password
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HashPoolBusy(Exception):
+    """Raised when the password hashing admission queue is full."""
+
+
+class PasswordHashPool:
+    """
+    Runs Argon2 hash/verify in a dedicated process pool so the event loop
+    never blocks on them. Admission is bounded: at most `workers` jobs run and
+    `queue_max` wait; anything beyond that is rejected with HashPoolBusy.
+    """
+
+    def __init__(self, workers: int, queue_max: int):
+        self.workers = max(1, workers)
+        self.queue_max = max(0, queue_max)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inflight = 0
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._inflight - self.workers)
+
+    def _update_gauges(self) -> None:
+        registry.set_gauge("auth_hash_inflight", self._inflight)
+        registry.set_gauge("auth_hash_queue_depth", self.queue_depth)
+
+    async def _submit(self, op: str, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._inflight >= self.workers + self.queue_max:
+            registry.inc("auth_hash_rejected_total", op=op)
+            raise HashPoolBusy(op)
+
+        self.start()
+        self._inflight += 1
+        self._update_gauges()
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._inflight -= 1
+            self._update_gauges()
+            registry.observe("auth_hash_seconds", time.perf_counter() - start, op=op)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit("hash", hash_password, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._submit("verify", verify_password, password, password_hash)
+
+
+hash_pool = PasswordHashPool(workers=settings.AUTH_HASH_WORKERS, queue_max=settings.AUTH_HASH_QUEUE_MAX)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import secrets
+import time
+from typing import Any, Awaitable, Callable
+
+from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from backend.common.metrics import registry
+
+from .config import settings
+
+logger = logging.getLogger("hivesync.idempotency")
+
+# Idempotency-Key support for create endpoints.
+#
+# The first request with a key claims idem:<user>:<scope>:<key> with SET NX as
+# "pending", runs the handler and overwrites the claim with its response. A
+# duplicate replays that response without touching Postgres or the broker; a
+# concurrent duplicate polls until the first finishes. Failed requests release
+# the claim so the client can retry with the same key.
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+RELEASE_LUA = """
+local v = redis.call('GET', KEYS[1])
+if v and cjson.decode(v)['owner'] == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _fingerprint(body: BaseModel) -> str:
+    return hashlib.sha256(body.model_dump_json().encode()).hexdigest()
+
+
+async def idempotent(
+    request: Request,
+    user_id: Any,
+    scope: str,
+    body: BaseModel,
+    handler: Callable[[], Awaitable[dict[str, Any]]],
+):
+    key = request.headers.get(HEADER)
+    if not key:
+        return await handler()
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{HEADER} is too long")
+
+    client = request.app.state.redis
+    redis_key = f"idem:{user_id}:{scope}:{key}"
+    fp = _fingerprint(body)
+    owner = secrets.token_hex(8)
+    pending = json.dumps({"state": "pending", "fp": fp, "owner": owner})
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    delay = 0.05
+
+    while True:
+        try:
+            acquired = await client.set(redis_key, pending, nx=True, ex=settings.IDEMPOTENCY_PENDING_TTL_SECONDS)
+            stored = None if acquired else await client.get(redis_key)
+        except Exception:
+            # Fail open: a Redis outage must not block job creation.
+            logger.warning("Idempotency store unavailable; processing %s without it", scope, exc_info=True)
+            return await handler()
+
+        if acquired:
+            return await _run_and_store(client, redis_key, fp, owner, scope, handler)
+
+        if stored is None:
+            # The first request failed and released the key between our two calls
+            continue
+        record = json.loads(stored)
+        if record["fp"] != fp:
+            raise HTTPException(status_code=422, detail=f"{HEADER} was reused with a different request body")
+        if record["state"] == "done":
+            registry.inc("idempotency_replays_total", scope=scope)
+            return JSONResponse(record["body"], headers={REPLAYED_HEADER: "true"})
+
+        if time.monotonic() >= deadline:
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still in progress",
+                headers={"Retry-After": "1"},
+            )
+        registry.inc("idempotency_waits_total", scope=scope)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+async def _run_and_store(client, redis_key: str, fp: str, owner: str, scope: str, handler) -> dict[str, Any]:
+    try:
+        result = await handler()
+    except BaseException:
+        try:
+            await client.eval(RELEASE_LUA, 1, redis_key, owner)
+        except Exception:
+            logger.warning("Failed to release idempotency key %s", redis_key, exc_info=True)
+        raise
+
+    record = {"state": "done", "fp": fp, "owner": owner, "body": jsonable_encoder(result)}
+    try:
+        await client.set(redis_key, json.dumps(record), ex=settings.IDEMPOTENCY_TTL_SECONDS)
+    except Exception:
+        logger.warning("Failed to store idempotent response for %s", scope, exc_info=True)
+    return result
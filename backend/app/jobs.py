@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from jose import jwt
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .auth import create_preview_token
+from .celery_app import TASK_AI_JOB_RUN, TASK_PREVIEW_REQUEST, celery_app
+from .config import settings
+from .db import AIJob, DeadLetter, JobStatus, OutboxMessage, PreviewSession, utcnow
+from .outbox import add_outbox_message
+from backend.common.deadlines import ai_job_deadline, preview_deadline
+from backend.common.lanes import lane_queue, tier_slo_seconds
+
+logger = logging.getLogger("hivesync.jobs")
+
+# Worker task payloads. Everything that enqueues preview/AI work (request
+# handlers, recovery, DLQ replay) builds kwargs here so the schema stays in one
+# place.
+
+TASK_SCHEMA_VERSION = 1
+
+
+# Tasks that act on a PreviewSession/AIJob row; without the row they can't be replayed
+ROW_BACKED_TASKS = frozenset({TASK_PREVIEW_REQUEST, TASK_AI_JOB_RUN})
+
+
+def _token_expiry(preview_token: str) -> Optional[datetime]:
+    exp = jwt.get_unverified_claims(preview_token).get("exp")
+    return datetime.fromtimestamp(exp, tz=timezone.utc) if exp else None
+
+
+def _ensure_deadline(row, deadline: datetime) -> datetime:
+    # Fixed once per request and reused by every re-enqueue (recovery); DLQ
+    # replay clears it so the replayed job gets a new one.
+    if row.deadline_at is None:
+        row.deadline_at = deadline
+    return row.deadline_at
+
+
+def preview_task_kwargs(
+    ps: PreviewSession, preview_token: str, deadline_from: Optional[datetime] = None
+) -> dict[str, Any]:
+    deadline = _ensure_deadline(ps, preview_deadline(ps.tier_snapshot, deadline_from or ps.created_at))
+    token_expires_at = _token_expiry(preview_token)
+    if token_expires_at is not None:
+        # A preview is useless once the client's token has expired
+        deadline = min(deadline, token_expires_at)
+    return {
+        "preview_id": ps.preview_id,
+        "preview_token": preview_token,
+        "user_id": str(ps.user_id) if ps.user_id else None,
+        "team_id": str(ps.team_id) if ps.team_id else None,
+        "project_id": str(ps.project_id) if ps.project_id else None,
+        "device_id": ps.device_id,
+        "revision": ps.revision,
+        "tier_snapshot": ps.tier_snapshot.value,
+        "requested_at": ps.created_at.isoformat(),
+        "enqueued_at": utcnow().isoformat(),
+        "slo_seconds": tier_slo_seconds(ps.tier_snapshot),
+        "deadline_at": deadline.isoformat(),
+        "schema_version": TASK_SCHEMA_VERSION,
+    }
+
+
+def ai_task_kwargs(job: AIJob, deadline_from: Optional[datetime] = None) -> dict[str, Any]:
+    deadline = _ensure_deadline(job, ai_job_deadline(job.tier_snapshot, job.job_type, deadline_from or job.created_at))
+    return {
+        "job_id": str(job.id),
+        "job_type": job.job_type,
+        "user_id": str(job.user_id) if job.user_id else None,
+        "team_id": str(job.team_id) if job.team_id else None,
+        "project_id": str(job.project_id) if job.project_id else None,
+        "tier_snapshot": job.tier_snapshot.value,
+        "selection": (job.params or {}).get("selection", {}),
+        "requested_at": job.created_at.isoformat(),
+        "enqueued_at": utcnow().isoformat(),
+        "slo_seconds": tier_slo_seconds(job.tier_snapshot),
+        "deadline_at": deadline.isoformat(),
+        "schema_version": TASK_SCHEMA_VERSION,
+    }
+
+
+def enqueue_preview(
+    db: AsyncSession, ps: PreviewSession, preview_token: str, deadline_from: Optional[datetime] = None
+) -> OutboxMessage:
+    """Stage the preview task in the caller's transaction; published after commit."""
+    return add_outbox_message(
+        db,
+        task_name=TASK_PREVIEW_REQUEST,
+        queue=lane_queue(settings.WORKER_PREVIEW_QUEUE, ps.tier_snapshot),
+        kwargs=preview_task_kwargs(ps, preview_token, deadline_from),
+        correlation_id=ps.preview_id,
+    )
+
+
+def enqueue_ai_job(db: AsyncSession, job: AIJob, deadline_from: Optional[datetime] = None) -> OutboxMessage:
+    """Stage the AI task in the caller's transaction; published after commit."""
+    return add_outbox_message(
+        db,
+        task_name=TASK_AI_JOB_RUN,
+        queue=lane_queue(settings.WORKER_AI_QUEUE, job.tier_snapshot),
+        kwargs=ai_task_kwargs(job, deadline_from),
+        correlation_id=str(job.id),
+    )
+
+
+async def cancel_job(db: AsyncSession, model, where, correlation_id: str) -> Optional[JobStatus]:
+    """
+    Mark a queued/running job cancelled and withdraw its task. Returns the
+    status it had, or None if it was already terminal. Bumping the fencing
+    token makes any write by a worker still running it fail.
+    """
+    res = await db.execute(
+        select(model.status)
+        .where(where, model.status.in_([JobStatus.queued, JobStatus.running]))
+        .with_for_update()
+    )
+    previous = res.scalar_one_or_none()
+    if previous is None:
+        return None
+
+    await db.execute(
+        update(model)
+        .where(where)
+        .values(
+            status=JobStatus.cancelled,
+            completed_at=utcnow(),
+            error="cancelled by user",
+            lease_owner=None,
+            lease_expires_at=None,
+            fencing_token=model.fencing_token + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    # Unpublished tasks never reach the broker; published ones are revoked.
+    await db.execute(
+        delete(OutboxMessage).where(
+            OutboxMessage.correlation_id == correlation_id, OutboxMessage.published_at.is_(None)
+        )
+    )
+    res = await db.execute(
+        select(OutboxMessage.id).where(
+            OutboxMessage.correlation_id == correlation_id, OutboxMessage.published_at.is_not(None)
+        )
+    )
+    published = [str(i) for i in res.scalars().all()]
+    await db.commit()
+
+    if published:
+        try:
+            await asyncio.to_thread(celery_app.control.revoke, published)
+        except Exception:
+            # Workers skip cancelled rows at claim time anyway
+            logger.warning("Failed to revoke tasks %s", published, exc_info=True)
+    return previous
+
+
+async def requeue_dead_letter(db: AsyncSession, dl: DeadLetter) -> bool:
+    """
+    Put the failed job behind a DLQ entry back to queued and enqueue it again
+    through the outbox, with a fresh payload (new deadline, new preview token).
+    Returns False if the job no longer exists or is no longer failed.
+    """
+    reset = dict(
+        status=JobStatus.queued,
+        error=None,
+        started_at=None,
+        completed_at=None,
+        recovery_count=0,
+        progress=None,
+        deadline_at=None,
+    )
+    if dl.ai_job_id:
+        res = await db.execute(
+            update(AIJob)
+            .where(AIJob.id == dl.ai_job_id, AIJob.status == JobStatus.failed)
+            .values(**reset)
+            .returning(AIJob)
+            .execution_options(synchronize_session=False)
+        )
+        job = res.scalar_one_or_none()
+        if job:
+            enqueue_ai_job(db, job, deadline_from=utcnow())
+        ok = job is not None
+    elif dl.preview_id:
+        res = await db.execute(
+            update(PreviewSession)
+            .where(PreviewSession.preview_id == dl.preview_id, PreviewSession.status == JobStatus.failed)
+            .values(**reset)
+            .returning(PreviewSession)
+            .execution_options(synchronize_session=False)
+        )
+        ps = res.scalar_one_or_none()
+        if ps:
+            token = create_preview_token(preview_id=ps.preview_id, user_id=str(ps.user_id), device_id=ps.device_id or "")
+            enqueue_preview(db, ps, token, deadline_from=utcnow())
+        ok = ps is not None
+    elif dl.task_name in ROW_BACKED_TASKS:
+        # A job task whose row was already gone when it failed (JobNotFound):
+        # replaying it would only fail again and write another dead letter.
+        ok = False
+    else:
+        # Row-independent task: replay the original payload, minus its stale deadline
+        kwargs = {k: v for k, v in (dl.payload or {}).items() if k != "deadline_at"}
+        add_outbox_message(db, task_name=dl.task_name, queue=dl.queue, kwargs=kwargs, correlation_id=None)
+        ok = True
+
+    if ok:
+        dl.requeued_at = utcnow()
+    await db.commit()
+    return ok
@@ -1,6 +1,8 @@
 from __future__ import annotations
+from backend.observability_admin.replay import replayer as dlq_replayer
 from backend.observability_admin.router import router as observability_admin_router
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
@@ -8,8 +10,15 @@ import redis.asyncio as redis
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from backend.common.metrics import process_source, publish_snapshot
+
+from .cache import attach_caches, listen_for_invalidations
 from .config import settings
 from .db import init_db
+from .events import hub as event_hub
+from .hashing import hash_pool
+from .outbox import relay as outbox_relay
+from .rate_limit import RateLimitMiddleware, RedisRateLimiter
 from .routers import api_router
 #from .redis import get_redis_client
 
@@ -20,20 +29,53 @@ def configure_logging() -> None:
     logging.getLogger("uvicorn.access").setLevel(logging.INFO)
 
 
+async def publish_metrics_forever(r: redis.Redis) -> None:
+    source = process_source("api")
+    while True:
+        try:
+            await publish_snapshot(r, source)
+        except Exception:
+            logging.getLogger(__name__).warning("Failed to publish metrics snapshot", exc_info=True)
+        await asyncio.sleep(settings.METRICS_PUBLISH_INTERVAL_SECONDS)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     configure_logging()
     await init_db()
     r = redis.from_url(settings.redis_url, decode_responses=True)
     app.state.redis = r
+    app.state.rate_limiter = RedisRateLimiter(
+        r,
+        mode=settings.RATE_LIMIT_MODE,
+        lease_size=settings.RATE_LIMIT_LEASE_SIZE,
+        lease_ttl_ms=settings.RATE_LIMIT_LEASE_TTL_MS,
+        lease_max_fraction=settings.RATE_LIMIT_LEASE_MAX_FRACTION,
+    )
+    attach_caches(r)
+    hash_pool.start()
+    background = [
+        asyncio.create_task(publish_metrics_forever(r)),
+        asyncio.create_task(listen_for_invalidations(r)),
+        asyncio.create_task(outbox_relay.run_forever()),
+        asyncio.create_task(event_hub.run_forever(r)),
+    ]
     try:
         yield
     finally:
+        for t in background:
+            t.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        await dlq_replayer.stop_all()
+        hash_pool.shutdown()
         await r.aclose()
 
 
 app = FastAPI(title="HiveSync Backend (core)", version="0.1.0", lifespan=lifespan)
 
+# Registered first so it sits inside CORS and 429s still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
+
 # CORS: permissive by default for local dev; tighten in deployment
 app.add_middleware(
     CORSMiddleware,
@@ -41,6 +83,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "Retry-After",
+        "X-RateLimit-Limit",
+        "X-RateLimit-Remaining",
+        "X-RateLimit-Reset",
+        "Idempotent-Replayed",
+    ],
 )
 
 app.include_router(api_router)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from datetime import timedelta
+from typing import Any, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.common.metrics import registry
+
+from .celery_app import celery_app
+from .config import settings
+from .db import AsyncSessionLocal, OutboxMessage, utcnow
+
+logger = logging.getLogger(__name__)
+
+
+def add_outbox_message(
+    db: AsyncSession,
+    *,
+    task_name: str,
+    queue: str,
+    kwargs: dict[str, Any],
+    correlation_id: Optional[str] = None,
+) -> OutboxMessage:
+    # The id doubles as the Celery task id, so a re-publish after a crash
+    # carries the same id and workers treat it as the same delivery.
+    msg = OutboxMessage(
+        id=uuid.uuid4(),
+        task_name=task_name,
+        queue=queue,
+        kwargs=kwargs,
+        correlation_id=correlation_id,
+        created_at=utcnow(),
+        available_at=utcnow(),
+    )
+    db.add(msg)
+    return msg
+
+
+def _publish_batch(messages: list[tuple[str, str, str, dict[str, Any]]]) -> list[Optional[str]]:
+    """Blocking: publish over one pooled producer connection. Returns an error per message (None on success)."""
+    errors: list[Optional[str]] = []
+    with celery_app.producer_or_acquire() as producer:
+        for task_id, task_name, queue, kwargs in messages:
+            try:
+                celery_app.send_task(task_name, kwargs=kwargs, queue=queue, task_id=task_id, producer=producer)
+                errors.append(None)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+    return errors
+
+
+class OutboxRelay:
+    """
+    Publishes committed outbox rows to the broker in batches. Rows are claimed
+    with FOR UPDATE SKIP LOCKED so several API processes can relay
+    concurrently without double-publishing; the kombu I/O runs in a thread.
+    """
+
+    def __init__(self, batch_size: int, poll_interval: float, retry_backoff: float, retention_hours: int):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        self.retention_hours = retention_hours
+        self._wake = asyncio.Event()
+
+    def notify(self) -> None:
+        """Called after a commit that staged messages, to publish without waiting for the next poll."""
+        self._wake.set()
+
+    async def run_forever(self) -> None:
+        last_prune = utcnow()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                while await self.drain_once() >= self.batch_size:
+                    pass
+                if utcnow() - last_prune > timedelta(minutes=10):
+                    await self.prune()
+                    last_prune = utcnow()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Outbox relay iteration failed")
+                await asyncio.sleep(self.poll_interval)
+
+    async def drain_once(self) -> int:
+        async with AsyncSessionLocal() as session:
+            now = utcnow()
+            res = await session.execute(
+                select(OutboxMessage)
+                .where(OutboxMessage.published_at.is_(None), OutboxMessage.available_at <= now)
+                .order_by(OutboxMessage.created_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            batch = res.scalars().all()
+            if not batch:
+                await session.rollback()
+                return 0
+
+            errors = await asyncio.to_thread(
+                _publish_batch, [(str(m.id), m.task_name, m.queue, m.kwargs) for m in batch]
+            )
+
+            now = utcnow()
+            for m, err in zip(batch, errors):
+                m.attempts += 1
+                if err is None:
+                    m.published_at = now
+                    registry.observe("outbox_lag_seconds", (now - m.created_at).total_seconds(), queue=m.queue)
+                    registry.inc("outbox_published_total", queue=m.queue)
+                else:
+                    m.last_error = err
+                    m.available_at = now + timedelta(seconds=self.retry_backoff * min(m.attempts, 12))
+                    registry.inc("outbox_publish_failures_total", queue=m.queue)
+                    logger.warning("Outbox publish failed for %s (%s): %s", m.id, m.task_name, err)
+            await session.commit()
+            registry.observe("outbox_batch_size", len(batch), buckets=(1, 5, 10, 25, 50, 100, 250, 500))
+            return len(batch)
+
+    async def prune(self) -> None:
+        async with AsyncSessionLocal() as session:
+            cutoff = utcnow() - timedelta(hours=self.retention_hours)
+            await session.execute(
+                delete(OutboxMessage).where(OutboxMessage.published_at.is_not(None), OutboxMessage.published_at < cutoff)
+            )
+            await session.commit()
+
+
+relay = OutboxRelay(
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL_SECONDS,
+    retry_backoff=settings.OUTBOX_RETRY_BACKOFF_SECONDS,
+    retention_hours=settings.OUTBOX_RETENTION_HOURS,
+)
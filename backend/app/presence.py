@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+import redis.asyncio as redis
+from sqlalchemy import bindparam, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.common.metrics import registry
+
+from .config import settings
+from .db import PreviewSession
+
+logger = logging.getLogger("hivesync.presence")
+
+# Preview presence, kept entirely in Redis:
+#   presence:<preview_id>         ZSET client_id -> last beat (epoch seconds)
+#   presence:<preview_id>:events  HASH client_id -> client-reported last_event_at
+#   presence:dirty                ZSET preview_id -> last beat, drained by the flusher
+
+DIRTY_KEY = "presence:dirty"
+
+# Drop a dirty marker only if no newer beat arrived while we were flushing.
+CLEAR_DIRTY_LUA = """
+local cutoff = tonumber(ARGV[1])
+for i = 2, #ARGV do
+  local score = redis.call('ZSCORE', KEYS[1], ARGV[i])
+  if score and tonumber(score) <= cutoff then
+    redis.call('ZREM', KEYS[1], ARGV[i])
+  end
+end
+return 0
+"""
+
+
+def presence_key(preview_id: str) -> str:
+    return f"presence:{preview_id}"
+
+
+def events_key(preview_id: str) -> str:
+    return f"presence:{preview_id}:events"
+
+
+async def record_heartbeat(client: redis.Redis, preview_id: str, client_id: str, last_event_at: datetime) -> None:
+    """One pipelined round trip; no database access."""
+    now = time.time()
+    ttl = settings.PREVIEW_PRESENCE_TTL_SECONDS
+    key, ev_key = presence_key(preview_id), events_key(preview_id)
+    pipe = client.pipeline(transaction=False)
+    pipe.zadd(key, {client_id: now})
+    pipe.zremrangebyscore(key, "-inf", now - ttl)
+    pipe.hset(ev_key, client_id, last_event_at.isoformat())
+    pipe.expire(key, ttl)
+    pipe.expire(ev_key, ttl)
+    pipe.zadd(DIRTY_KEY, {preview_id: now})
+    await pipe.execute()
+    registry.inc("preview_heartbeats_total")
+
+
+async def active_clients(client: redis.Redis, preview_id: str) -> list[dict[str, Any]]:
+    since = time.time() - settings.PREVIEW_PRESENCE_WINDOW_SECONDS
+    members = await client.zrevrangebyscore(presence_key(preview_id), "+inf", since, withscores=True)
+    if not members:
+        return []
+    last_events = await client.hmget(events_key(preview_id), [m for m, _ in members])
+    return [
+        {
+            "client_id": member,
+            "last_seen_at": datetime.fromtimestamp(score, tz=timezone.utc),
+            "last_event_at": last_event,
+        }
+        for (member, score), last_event in zip(members, last_events)
+    ]
+
+
+_flush_stmt = (
+    update(PreviewSession.__table__)
+    .where(PreviewSession.__table__.c.preview_id == bindparam("b_preview_id"))
+    .values(last_seen_at=bindparam("b_last_seen_at"), active_clients=bindparam("b_active_clients"))
+)
+
+
+async def flush_presence(client: redis.Redis, session: AsyncSession) -> int:
+    """Write last-seen state for every preview that beat since the last flush."""
+    cutoff = time.time()
+    since = cutoff - settings.PREVIEW_PRESENCE_WINDOW_SECONDS
+    batch = settings.PREVIEW_PRESENCE_FLUSH_BATCH_SIZE
+    flushed = 0
+
+    while True:
+        dirty = await client.zrangebyscore(DIRTY_KEY, "-inf", cutoff, start=0, num=batch)
+        if not dirty:
+            break
+
+        pipe = client.pipeline(transaction=False)
+        for preview_id in dirty:
+            pipe.zrevrange(presence_key(preview_id), 0, 0, withscores=True)
+            pipe.zcount(presence_key(preview_id), since, "+inf")
+        res = await pipe.execute()
+
+        rows = []
+        for i, preview_id in enumerate(dirty):
+            latest, count = res[2 * i], res[2 * i + 1]
+            if not latest:
+                continue
+            rows.append(
+                {
+                    "b_preview_id": preview_id,
+                    "b_last_seen_at": datetime.fromtimestamp(latest[0][1], tz=timezone.utc),
+                    "b_active_clients": count,
+                }
+            )
+        if rows:
+            await session.execute(_flush_stmt, rows)
+            await session.commit()
+
+        await client.eval(CLEAR_DIRTY_LUA, 1, DIRTY_KEY, cutoff, *dirty)
+        flushed += len(rows)
+        if len(dirty) < batch:
+            break
+
+    if flushed:
+        registry.inc("preview_presence_flushed_total", flushed)
+    return flushed
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import uuid
+from typing import Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.common.metrics import registry
+
+from .db import JobStatus, OutboxMessage, PreviewSession, utcnow
+
+# Coalescing and supersession of preview builds per (user, project, device).
+#
+# Only the newest build for a device matters. A request for a revision that is
+# already queued or running attaches to that build; any other queued build for
+# the device is cancelled (and its unpublished task dropped) so workers skip it
+# without doing any work. Running builds are left to finish.
+
+
+async def lock_preview_slot(db: AsyncSession, user_id: uuid.UUID, project_id: uuid.UUID, device_id: str) -> None:
+    """Serialize concurrent requests for one device until the transaction ends."""
+    await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(f"preview:{user_id}:{project_id}:{device_id}"))))
+
+
+async def find_inflight_preview(
+    db: AsyncSession, user_id: uuid.UUID, project_id: uuid.UUID, device_id: str, revision: str
+) -> Optional[PreviewSession]:
+    res = await db.execute(
+        select(PreviewSession)
+        .where(
+            PreviewSession.user_id == user_id,
+            PreviewSession.project_id == project_id,
+            PreviewSession.device_id == device_id,
+            PreviewSession.revision == revision,
+            PreviewSession.status.in_([JobStatus.queued, JobStatus.running]),
+        )
+        .order_by(PreviewSession.created_at.desc())
+        .limit(1)
+    )
+    return res.scalar_one_or_none()
+
+
+async def supersede_queued_previews(
+    db: AsyncSession, user_id: uuid.UUID, project_id: uuid.UUID, device_id: str, superseded_by: str
+) -> list[str]:
+    """Cancel every still-queued build for the device; returns their preview_ids."""
+    res = await db.execute(
+        update(PreviewSession)
+        .where(
+            PreviewSession.user_id == user_id,
+            PreviewSession.project_id == project_id,
+            PreviewSession.device_id == device_id,
+            PreviewSession.status == JobStatus.queued,
+            PreviewSession.preview_id != superseded_by,
+        )
+        .values(status=JobStatus.cancelled, completed_at=utcnow(), error=f"superseded by {superseded_by}")
+        .returning(PreviewSession.preview_id)
+        .execution_options(synchronize_session=False)
+    )
+    cancelled = list(res.scalars().all())
+    if cancelled:
+        # Tasks the relay has not published yet never reach the broker.
+        await db.execute(
+            delete(OutboxMessage).where(
+                OutboxMessage.correlation_id.in_(cancelled),
+                OutboxMessage.published_at.is_(None),
+            )
+        )
+        registry.inc("preview_superseded_total", len(cancelled))
+    return cancelled
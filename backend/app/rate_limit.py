@@ -1,12 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
+import math
 import time
-from dataclasses import dataclass
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from typing import Optional
 
 import redis.asyncio as redis
 
+from backend.common.metrics import registry
+
+from .auth import decode_access_token
 from .config import settings
+from .db import Tier
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass(frozen=True)
@@ -14,24 +25,373 @@ class LimitResult:
     allowed: bool
     remaining: int
     retry_after_seconds: int
+    limit: int = 0
+    reset_seconds: int = 0
+
+
+# Sliding-window counter: the previous fixed window is weighted by how much of
+# it still overlaps the sliding window. One EVALSHA per check; both keys share
+# a hash tag so the script is cluster-safe.
+#
+# KEYS[1] = base key   ARGV = limit, window_ms, now_ms, cost
+# returns {allowed, remaining, retry_after_ms, reset_ms}
+SLIDING_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+
+local cur_id = math.floor(now / window)
+local cur_key = KEYS[1] .. ':' .. cur_id
+local prev_key = KEYS[1] .. ':' .. (cur_id - 1)
+
+local cur = tonumber(redis.call('GET', cur_key) or '0')
+local prev = tonumber(redis.call('GET', prev_key) or '0')
+
+local elapsed = now - cur_id * window
+local weight = (window - elapsed) / window
+local estimated = prev * weight + cur
+local reset = window - elapsed
+
+if estimated + cost > limit then
+  local retry
+  if cur + cost > limit or prev == 0 then
+    retry = reset
+  else
+    local w_needed = (limit - cur - cost) / prev
+    retry = math.ceil(window * (1 - w_needed) - elapsed)
+  end
+  if retry < 1 then retry = 1 end
+  return {0, 0, retry, reset}
+end
+
+redis.call('INCRBY', cur_key, cost)
+redis.call('PEXPIRE', cur_key, window * 2)
+return {1, math.floor(limit - estimated - cost), 0, reset}
+"""
+
+
+# Lease variant for hybrid mode: optionally refunds the unused part of the
+# previous lease (only if it was taken in the current window), then grants up
+# to `want` tokens that still fit under the sliding-window estimate.
+#
+# KEYS[1] = base key   ARGV = limit, window_ms, now_ms, want, refund, refund_window_id
+# returns {granted, remaining_after_grant, retry_after_ms, reset_ms, window_id}
+LEASE_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local want = tonumber(ARGV[4])
+local refund = tonumber(ARGV[5])
+local refund_window = tonumber(ARGV[6])
+
+local cur_id = math.floor(now / window)
+local cur_key = KEYS[1] .. ':' .. cur_id
+local prev_key = KEYS[1] .. ':' .. (cur_id - 1)
+
+if refund > 0 and refund_window == cur_id then
+  local left = redis.call('DECRBY', cur_key, refund)
+  if left < 0 then redis.call('SET', cur_key, 0, 'PX', window * 2) end
+end
+
+local cur = tonumber(redis.call('GET', cur_key) or '0')
+local prev = tonumber(redis.call('GET', prev_key) or '0')
+
+local elapsed = now - cur_id * window
+local weight = (window - elapsed) / window
+local estimated = prev * weight + cur
+local reset = window - elapsed
+
+local grant = math.min(want, math.floor(limit - estimated))
+if grant < 1 then
+  local retry
+  if cur + 1 > limit or prev == 0 then
+    retry = reset
+  else
+    local w_needed = (limit - cur - 1) / prev
+    retry = math.ceil(window * (1 - w_needed) - elapsed)
+  end
+  if retry < 1 then retry = 1 end
+  return {0, 0, retry, reset, cur_id}
+end
+
+redis.call('INCRBY', cur_key, grant)
+redis.call('PEXPIRE', cur_key, window * 2)
+return {grant, math.floor(limit - estimated - grant), 0, reset, cur_id}
+"""
+
+
+@dataclass
+class _Lease:
+    tokens: int
+    remaining: int
+    expires_at: float
+    window_id: int
+    reset_at: float
+    denied_until: float = 0.0
 
 
 class RedisRateLimiter:
-    def __init__(self, client: redis.Redis):
+    """
+    mode="redis": every hit is one atomic script call.
+
+    mode="hybrid": each process keeps a local bucket per key holding a small
+    lease of tokens taken from the shared Redis window, and only calls Redis
+    to refill (refunding the unused part of the previous lease) or after a
+    denial expires. Larger leases save more round trips but let a key
+    overshoot by up to (processes x lease size) and strand unused tokens for
+    up to lease_ttl_ms; a lease never exceeds lease_max_fraction of the limit.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        mode: str = "redis",
+        lease_size: int = 10,
+        lease_ttl_ms: int = 1000,
+        lease_max_fraction: float = 0.1,
+        max_local_keys: int = 100000,
+    ):
         self.client = client
+        self.mode = mode
+        self.lease_size = max(1, lease_size)
+        self.lease_ttl = lease_ttl_ms / 1000
+        self.lease_max_fraction = lease_max_fraction
+        self.max_local_keys = max_local_keys
+        self.redis_calls = 0
+        self.local_hits = 0
+        self._script = client.register_script(SLIDING_WINDOW_LUA)
+        self._lease_script = client.register_script(LEASE_LUA)
+        self._leases: OrderedDict[str, _Lease] = OrderedDict()
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def hit(self, key: str, limit: int, window_seconds: int, cost: int = 1) -> LimitResult:
+        if self.mode == "hybrid" and cost == 1:
+            return await self._hit_hybrid(key, limit, window_seconds)
+
+        now_ms = int(time.time() * 1000)
+        self.redis_calls += 1
+        allowed, remaining, retry_ms, reset_ms = await self._script(
+            keys=[f"rl:{{{key}}}"],
+            args=[limit, window_seconds * 1000, now_ms, cost],
+        )
+        return LimitResult(
+            allowed=bool(int(allowed)),
+            remaining=max(0, int(remaining)),
+            retry_after_seconds=math.ceil(int(retry_ms) / 1000) if not int(allowed) else 0,
+            limit=limit,
+            reset_seconds=math.ceil(int(reset_ms) / 1000),
+        )
+
+    def _take_local(self, key: str, limit: int, now: float) -> Optional[LimitResult]:
+        lease = self._leases.get(key)
+        if lease is None:
+            return None
+        if lease.denied_until > now:
+            self.local_hits += 1
+            return LimitResult(
+                allowed=False,
+                remaining=0,
+                retry_after_seconds=math.ceil(lease.denied_until - now),
+                limit=limit,
+                reset_seconds=max(0, math.ceil(lease.reset_at - now)),
+            )
+        if lease.tokens > 0 and lease.expires_at > now:
+            lease.tokens -= 1
+            lease.remaining = max(0, lease.remaining - 1)
+            self.local_hits += 1
+            self._leases.move_to_end(key)
+            return LimitResult(
+                allowed=True,
+                remaining=lease.remaining + lease.tokens,
+                retry_after_seconds=0,
+                limit=limit,
+                reset_seconds=max(0, math.ceil(lease.reset_at - now)),
+            )
+        return None
+
+    async def _hit_hybrid(self, key: str, limit: int, window_seconds: int) -> LimitResult:
+        result = self._take_local(key, limit, time.monotonic())
+        if result is not None:
+            return result
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another coroutine may have refilled while we waited.
+            now = time.monotonic()
+            result = self._take_local(key, limit, now)
+            if result is not None:
+                return result
+
+            old = self._leases.pop(key, None)
+            refund = old.tokens if old and old.denied_until <= now else 0
+            want = max(1, min(self.lease_size, int(limit * self.lease_max_fraction)))
+
+            self.redis_calls += 1
+            granted, remaining, retry_ms, reset_ms, window_id = await self._lease_script(
+                keys=[f"rl:{{{key}}}"],
+                args=[limit, window_seconds * 1000, int(time.time() * 1000), want, refund, old.window_id if old else -1],
+            )
+            granted, remaining, window_id = int(granted), int(remaining), int(window_id)
+            reset_at = now + int(reset_ms) / 1000
+
+            if granted < 1:
+                retry = int(retry_ms) / 1000
+                self._store(key, _Lease(0, 0, now, window_id, reset_at, denied_until=now + retry))
+                return LimitResult(
+                    allowed=False,
+                    remaining=0,
+                    retry_after_seconds=max(1, math.ceil(retry)),
+                    limit=limit,
+                    reset_seconds=math.ceil(int(reset_ms) / 1000),
+                )
+
+            self._store(key, _Lease(granted - 1, max(0, remaining), now + self.lease_ttl, window_id, reset_at))
+        if len(self._locks) > self.max_local_keys:
+            self._locks.clear()
+        return LimitResult(
+            allowed=True,
+            remaining=max(0, remaining) + granted - 1,
+            retry_after_seconds=0,
+            limit=limit,
+            reset_seconds=math.ceil(int(reset_ms) / 1000),
+        )
+
+    def _store(self, key: str, lease: _Lease) -> None:
+        self._leases[key] = lease
+        self._leases.move_to_end(key)
+        while len(self._leases) > self.max_local_keys:
+            self._leases.popitem(last=False)
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    # tier -> (limit, window_seconds); a missing tier is unlimited
+    limits: dict[Tier, tuple[int, int]] = field(default_factory=dict)
+    method: Optional[str] = None
+    path: Optional[str] = None
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.method is None or self.method == method) and (self.path is None or self.path == path)
+
+
+# First matching rule wins; the last rule is the per-tier default for all routes.
+RATE_LIMIT_RULES: list[RateLimitRule] = [
+    RateLimitRule("health", {}, path="/health"),
+    RateLimitRule(
+        "preview_request",
+        {Tier.Free: (10, 60), Tier.Pro: (30, 60), Tier.Premium: (60, 60)},
+        method="POST",
+        path="/preview/request",
+    ),
+    RateLimitRule(
+        "ai_jobs",
+        {Tier.Free: (10, 60), Tier.Pro: (60, 60), Tier.Premium: (120, 60)},
+        method="POST",
+        path="/ai/jobs",
+    ),
+    RateLimitRule(
+        "auth_login",
+        {tier: (10, 60) for tier in Tier},
+        method="POST",
+        path="/auth/login",
+    ),
+    RateLimitRule(
+        "auth_register",
+        {tier: (5, 60) for tier in Tier},
+        method="POST",
+        path="/auth/register",
+    ),
+    RateLimitRule(
+        "default",
+        {Tier.Free: (300, 60), Tier.Pro: (600, 60), Tier.Premium: (1200, 60)},
+    ),
+]
+
+
+def match_rule(method: str, path: str) -> Optional[RateLimitRule]:
+    for rule in RATE_LIMIT_RULES:
+        if rule.matches(method, path):
+            return rule
+    return None
+
+
+def _identity(scope) -> tuple[str, Tier]:
+    """
+    Authenticated callers are limited per user at the tier in their access
+    token (a tier change applies once the token is refreshed); everyone else
+    per client IP at Free limits.
+    """
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    payload = decode_access_token(token)
+                    return f"user:{payload['sub']}", Tier(payload.get("tier", Tier.Free.value))
+                except Exception:
+                    pass
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}", Tier.Free
+
+
+def _limit_headers(result: LimitResult) -> list[tuple[bytes, bytes]]:
+    headers = [
+        (b"x-ratelimit-limit", str(result.limit).encode()),
+        (b"x-ratelimit-remaining", str(result.remaining).encode()),
+        (b"x-ratelimit-reset", str(result.reset_seconds).encode()),
+    ]
+    if not result.allowed:
+        headers.append((b"retry-after", str(result.retry_after_seconds).encode()))
+    return headers
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying RATE_LIMIT_RULES through the limiter stored on
+    app.state.rate_limiter. Fails open if Redis is unavailable.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            return await self.app(scope, receive, send)
+
+        limiter = getattr(scope["app"].state, "rate_limiter", None)
+        rule = match_rule(scope["method"], scope["path"])
+        if limiter is None or rule is None:
+            return await self.app(scope, receive, send)
+
+        identity, tier = _identity(scope)
+        limit = rule.limits.get(tier)
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        try:
+            result = await limiter.hit(f"{rule.name}:{identity}", limit[0], limit[1])
+        except Exception:
+            logger.warning("Rate limiter unavailable; allowing request", exc_info=True)
+            return await self.app(scope, receive, send)
+
+        headers = _limit_headers(result)
+        if not result.allowed:
+            registry.inc("rate_limited_total", rule=rule.name, tier=tier.value)
+            body = json.dumps({"detail": "Rate limit exceeded"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *headers],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), *headers]}
+            await send(message)
 
-    async def hit(self, key: str, limit: int, window_seconds: int) -> LimitResult:
-        # Fixed window: INCR + EXPIRE
-        now = int(time.time())
-        window_key = f"rl:{key}:{now // window_seconds}"
-        pipe = self.client.pipeline()
-        pipe.incr(window_key, 1)
-        pipe.ttl(window_key)
-        count, ttl = await pipe.execute()
-        if ttl == -1:
-            await self.client.expire(window_key, window_seconds)
-            ttl = window_seconds
-        remaining = max(0, limit - int(count))
-        allowed = int(count) <= limit
-        retry = int(ttl) if not allowed else 0
-        return LimitResult(allowed=allowed, remaining=remaining, retry_after_seconds=retry)
+        await self.app(scope, receive, send_with_headers)
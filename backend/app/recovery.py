@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import logging
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
+from typing import Any
 
 from celery import Celery
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import and_, delete, func, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.app.auth import create_preview_token
 from backend.app.config import settings
 from backend.app.db import (
     Worker,
@@ -13,6 +18,15 @@ from backend.app.db import (
     AIJob,
     JobStatus,
 )
+from backend.app.jobs import enqueue_ai_job, enqueue_preview
+from backend.app.presence import flush_presence
+from backend.common.events import publish_job_event
+from backend.common.heartbeat import HeartbeatPublisher, read_alive, upsert_workers
+from backend.common.metrics import registry
+from backend.common.result_cache import prune_index
+from backend.common.worker_runtime import WorkerRuntime
+
+logger = logging.getLogger("hivesync.recovery")
 
 celery = Celery(
     "hivesync_recovery",
@@ -20,10 +34,11 @@ celery = Celery(
     backend=settings.redis_url,
 )
 
-engine = create_async_engine(settings.database_url, pool_pre_ping=True)
-SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+runtime = WorkerRuntime("recovery")
+heartbeats = HeartbeatPublisher("recovery", f"recovery-{uuid.uuid4()}")
+runtime.add_background(lambda rt: heartbeats.run_forever(rt.redis))
 
-STALE_WORKER_SECONDS = 60
+# Fallback for running rows that carry no lease (written before leases existed)
 STUCK_JOB_MINUTES = 10
 
 
@@ -33,46 +48,181 @@ def utcnow() -> datetime:
 
 @celery.task(name="hivesync.recovery.sweep")
 def recovery_sweep():
-    import asyncio
-    asyncio.run(_recovery_async())
+    runtime.run(_recovery_async())
+
+
+@celery.task(name="hivesync.presence.flush")
+def presence_flush():
+    runtime.run(_presence_flush_async())
+
+
+async def _presence_flush_async():
+    async with runtime.session() as session:
+        n = await flush_presence(runtime.redis, session)
+    if n:
+        logger.info("Flushed presence for %s previews", n)
+
+
+def _event_id(model):
+    # Column clients subscribe by: previews are addressed by preview_id
+    return model.preview_id if model is PreviewSession else model.id
+
+
+def _expired(model, now: datetime):
+    return and_(
+        model.status == JobStatus.running,
+        or_(
+            model.lease_expires_at < now,
+            and_(
+                model.lease_expires_at.is_(None),
+                func.coalesce(model.started_at, model.created_at) < now - timedelta(minutes=STUCK_JOB_MINUTES),
+            ),
+        ),
+    )
+
+
+def _expired_batch(model, now: datetime, *extra):
+    # Bounded, lock-skipping batch so the sweep never holds locks on the whole
+    # table or blocks on rows a worker is currently writing.
+    return (
+        select(model.id)
+        .where(_expired(model, now), *extra)
+        .limit(settings.RECOVERY_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+
+
+async def _requeue_expired(session: AsyncSession, model, now: datetime) -> list[Any]:
+    res = await session.execute(
+        update(model)
+        .where(model.id.in_(_expired_batch(model, now, model.recovery_count < settings.RECOVERY_MAX_REQUEUES)))
+        .values(
+            status=JobStatus.queued,
+            started_at=None,
+            lease_expires_at=None,
+            lease_owner=None,
+            # Fence off the worker that lost the lease.
+            fencing_token=model.fencing_token + 1,
+            recovery_count=model.recovery_count + 1,
+        )
+        .returning(model)
+        .execution_options(synchronize_session=False)
+    )
+    return list(res.scalars().all())
+
+
+async def _fail_expired(session: AsyncSession, model, now: datetime) -> list[Any]:
+    res = await session.execute(
+        update(model)
+        .where(model.id.in_(_expired_batch(model, now)))
+        .values(
+            status=JobStatus.failed,
+            error="stuck_timeout",
+            completed_at=now,
+            lease_expires_at=None,
+            lease_owner=None,
+            fencing_token=model.fencing_token + 1,
+        )
+        .returning(_event_id(model))
+        .execution_options(synchronize_session=False)
+    )
+    return list(res.scalars().all())
+
+
+async def _sweep_jobs(session: AsyncSession, model, kind: str, now: datetime) -> dict[str, int]:
+    counts = {"requeued": 0, "failed": 0}
+
+    if settings.RECOVERY_REQUEUE_STUCK:
+        while True:
+            rows = await _requeue_expired(session, model, now)
+            for row in rows:
+                if kind == "preview":
+                    token = create_preview_token(
+                        preview_id=row.preview_id, user_id=str(row.user_id), device_id=row.device_id or ""
+                    )
+                    enqueue_preview(session, row, token)
+                else:
+                    enqueue_ai_job(session, row)
+            # Status flip and outbox rows commit together.
+            await session.commit()
+            counts["requeued"] += len(rows)
+            for row in rows:
+                job_id = row.preview_id if kind == "preview" else row.id
+                await publish_job_event(runtime.redis, kind, job_id, "status", status=JobStatus.queued.value)
+            if len(rows) < settings.RECOVERY_BATCH_SIZE:
+                break
+
+    # Anything still expired is out of requeues (or requeueing is off).
+    while True:
+        ids = await _fail_expired(session, model, now)
+        await session.commit()
+        counts["failed"] += len(ids)
+        for job_id in ids:
+            await publish_job_event(
+                runtime.redis, kind, job_id, "status", status=JobStatus.failed.value, error="stuck_timeout"
+            )
+        if len(ids) < settings.RECOVERY_BATCH_SIZE:
+            break
+
+    for action, n in counts.items():
+        if n:
+            registry.inc("recovery_jobs_total", n, kind=kind, action=action)
+    return counts
 
 
 async def _recovery_async():
-    async with SessionLocal() as session:
+    started = time.perf_counter()
+    async with runtime.session() as session:
         now = utcnow()
 
-        # ---- stale workers
-        stale_before = now - timedelta(seconds=STALE_WORKER_SECONDS)
-        res = await session.execute(
-            select(Worker).where(Worker.last_heartbeat_at < stale_before)
-        )
-        for w in res.scalars().all():
-            w.metadata = {**(w.metadata or {}), "stale": True}
-        await session.commit()
-
-        # ---- stuck previews
-        stuck_before = now - timedelta(minutes=STUCK_JOB_MINUTES)
-        res = await session.execute(
-            select(PreviewSession).where(
-                PreviewSession.status == JobStatus.running,
-                PreviewSession.created_at < stuck_before,
+        # ---- workers: liveness comes from Redis; persist it in one upsert,
+        # flag every row that is no longer beating, and drop rows of workers
+        # gone for longer than the retention window (single statement each).
+        # Worker ids are per process, so without pruning every restart adds a row.
+        stale_workers = 0
+        pruned_workers = 0
+        try:
+            beats = await read_alive(runtime.redis)
+        except Exception:
+            logger.warning("Worker liveness unavailable; skipping stale-worker check", exc_info=True)
+        else:
+            await upsert_workers(session, beats)
+            # Live rows were just upserted with their latest beat
+            dead_before = now - timedelta(seconds=settings.WORKER_LIVENESS_TTL_SECONDS)
+            res = await session.execute(
+                update(Worker)
+                .where(
+                    Worker.last_heartbeat_at < dead_before,
+                    text("COALESCE((workers.metadata_::jsonb ->> 'stale')::boolean, false) = false"),
+                )
+                .values(metadata_=text("(COALESCE(workers.metadata_::jsonb, '{}'::jsonb) || '{\"stale\": true}'::jsonb)::json"))
+                .returning(Worker.id)
+                .execution_options(synchronize_session=False)
             )
-        )
-        for p in res.scalars().all():
-            p.status = JobStatus.failed
-            p.error = "stuck_timeout"
-            p.completed_at = now
-
-        # ---- stuck AI jobs
-        res = await session.execute(
-            select(AIJob).where(
-                AIJob.status == JobStatus.running,
-                AIJob.created_at < stuck_before,
+            stale_workers = len(res.all())
+            res = await session.execute(
+                delete(Worker)
+                .where(Worker.last_heartbeat_at < now - timedelta(seconds=settings.WORKER_RETENTION_SECONDS))
+                .returning(Worker.id)
+                .execution_options(synchronize_session=False)
             )
-        )
-        for j in res.scalars().all():
-            j.status = JobStatus.failed
-            j.error = "stuck_timeout"
-            j.completed_at = now
-
-        await session.commit()
+            pruned_workers = len(res.all())
+            await session.commit()
+
+        previews = await _sweep_jobs(session, PreviewSession, "preview", now)
+        ai_jobs = await _sweep_jobs(session, AIJob, "ai", now)
+
+    try:
+        await prune_index(runtime.redis)
+    except Exception:
+        logger.warning("Failed to prune AI result cache index", exc_info=True)
+
+    elapsed = time.perf_counter() - started
+    registry.observe("recovery_sweep_seconds", elapsed)
+    registry.inc("recovery_stale_workers_total", stale_workers)
+    registry.inc("recovery_pruned_workers_total", pruned_workers)
+    logger.info(
+        "Recovery sweep took %.3fs: stale_workers=%s pruned_workers=%s previews=%s ai_jobs=%s",
+        elapsed, stale_workers, pruned_workers, previews, ai_jobs,
+    )
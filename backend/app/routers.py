@@ -8,9 +8,11 @@ from typing import Any, Optional
 
 import httpx
 from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel, EmailStr, Field
 
+from .admission import admission
 from .auth import (
     ACCESS_TOKEN_MINUTES,
     REFRESH_TOKEN_DAYS,
@@ -19,14 +21,13 @@ from .auth import (
     create_preview_token,
     create_refresh_token,
     decode_access_token,
-    hash_password,
     hash_refresh_token,
     hmac_sha256_hex,
-    verify_password,
     verify_preview_token,
 )
-from .celery_app import TASK_AI_JOB_RUN, TASK_PREVIEW_REQUEST, celery_app
+from .cache import MISS, TwoLevelCache
 from .config import settings
+from .events import sse_job_stream
 from .db import (
     AIJob,
     AsyncSessionLocal,
@@ -45,12 +46,46 @@ from .db import (
     User,
     utcnow as db_utcnow,
 )
+from .hashing import HashPoolBusy, hash_pool
+from .idempotency import idempotent
+from .jobs import cancel_job, enqueue_ai_job, enqueue_preview
+from .outbox import relay as outbox_relay
+from .presence import active_clients, record_heartbeat
+from .previews import find_inflight_preview, lock_preview_slot, supersede_queued_previews
+from backend.common.cancellation import request_cancel
+from backend.common.events import AI, PREVIEW, job_channel, publish_job_event
+from backend.common.metrics import registry
+from backend.common.progress import read_progress
+from backend.common.result_cache import cache_scope, get_result, result_cache_key
 
 logger = logging.getLogger(__name__)
 bearer = HTTPBearer(auto_error=False)
 
 api_router = APIRouter()
 
+principal_cache = TwoLevelCache(
+    "principal",
+    local_ttl=settings.PRINCIPAL_CACHE_LOCAL_TTL_SECONDS,
+    redis_ttl=settings.PRINCIPAL_CACHE_REDIS_TTL_SECONDS,
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+)
+
+# (user_id, team_id) -> role value, or None for "not a member"
+membership_cache = TwoLevelCache(
+    "membership",
+    local_ttl=settings.AUTHZ_CACHE_LOCAL_TTL_SECONDS,
+    redis_ttl=settings.AUTHZ_CACHE_REDIS_TTL_SECONDS,
+    max_entries=settings.AUTHZ_CACHE_MAX_ENTRIES,
+)
+
+# project_id -> team_id and task_id -> {project_id, team_id}; rows never move between parents
+ancestry_cache = TwoLevelCache(
+    "ancestry",
+    local_ttl=settings.ANCESTRY_CACHE_LOCAL_TTL_SECONDS,
+    redis_ttl=settings.ANCESTRY_CACHE_REDIS_TTL_SECONDS,
+    max_entries=settings.AUTHZ_CACHE_MAX_ENTRIES,
+)
+
 
 async def get_db():
     async with AsyncSessionLocal() as session:
@@ -77,30 +112,121 @@ async def get_current_user(
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
+    cached = await principal_cache.get(user_id)
+    if cached is not MISS:
+        return _principal_to_user(cached)
+
     from sqlalchemy import select
 
+    # Taken before the read, so a tier change committed meanwhile isn't overwritten
+    fill = await principal_cache.fill_token(user_id)
     res = await db.execute(select(User).where(User.id == uuid.UUID(user_id)))
     user = res.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    await principal_cache.set(user_id, _user_to_principal(user), token=fill)
     return user
 
 
+def _user_to_principal(user: User) -> dict[str, Any]:
+    return {"id": str(user.id), "email": user.email, "username": user.username, "tier": user.tier.value}
+
+
+def _principal_to_user(p: dict[str, Any]) -> User:
+    # Detached, read-only principal; handlers only use id/email/username/tier.
+    return User(id=uuid.UUID(p["id"]), email=p["email"], username=p["username"], tier=Tier(p["tier"]))
+
+
 async def require_team_role(
     team_id: uuid.UUID,
     user: User,
     db,
     allowed: set[TeamRole],
 ) -> TeamMember:
-    from sqlalchemy import select
+    key = f"{user.id}:{team_id}"
+    role = await membership_cache.get(key)
+    if role is MISS:
+        from sqlalchemy import select
+
+        fill = await membership_cache.fill_token(key)
+        res = await db.execute(
+            select(TeamMember.role).where(TeamMember.team_id == team_id, TeamMember.user_id == user.id)
+        )
+        found = res.scalar_one_or_none()
+        role = found.value if found else None
+        await membership_cache.set(key, role, token=fill)
 
-    res = await db.execute(
-        select(TeamMember).where(TeamMember.team_id == team_id, TeamMember.user_id == user.id)
-    )
-    tm = res.scalar_one_or_none()
-    if not tm or tm.role not in allowed:
+    if role is None or TeamRole(role) not in allowed:
         raise HTTPException(status_code=403, detail="Forbidden")
-    return tm
+    # Detached row; callers only inspect .role
+    return TeamMember(team_id=team_id, user_id=user.id, role=TeamRole(role))
+
+
+async def invalidate_membership(user_id: uuid.UUID, team_id: uuid.UUID) -> None:
+    await membership_cache.invalidate(f"{user_id}:{team_id}")
+
+
+async def resolve_project_team(project_id: uuid.UUID, db) -> uuid.UUID | None:
+    key = f"project:{project_id}"
+    team_id = await ancestry_cache.get(key)
+    if team_id is MISS:
+        from sqlalchemy import select
+
+        res = await db.execute(select(Project.team_id).where(Project.id == project_id))
+        team_id = res.scalar_one_or_none()
+        if team_id is None:
+            return None
+        team_id = str(team_id)
+        await ancestry_cache.set(key, team_id)
+    return uuid.UUID(team_id)
+
+
+async def resolve_task_ancestry(task_id: uuid.UUID, db) -> tuple[uuid.UUID, uuid.UUID] | None:
+    key = f"task:{task_id}"
+    anc = await ancestry_cache.get(key)
+    if anc is MISS:
+        from sqlalchemy import select
+
+        res = await db.execute(
+            select(Task.project_id, Project.team_id)
+            .join(Project, Project.id == Task.project_id)
+            .where(Task.id == task_id)
+        )
+        row = res.one_or_none()
+        if row is None:
+            return None
+        anc = {"project_id": str(row.project_id), "team_id": str(row.team_id)}
+        await ancestry_cache.set(key, anc)
+    return uuid.UUID(anc["project_id"]), uuid.UUID(anc["team_id"])
+
+
+def hash_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy, retry shortly",
+        headers={"Retry-After": str(settings.AUTH_HASH_RETRY_AFTER_SECONDS)},
+    )
+
+
+async def require_job_reader(owner_id: uuid.UUID | None, team_id: uuid.UUID | None, user: User, db) -> None:
+    if owner_id == user.id or user.tier == Tier.Admin:
+        return
+    if team_id is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    await require_team_role(
+        team_id, user, db, allowed={TeamRole.owner, TeamRole.admin, TeamRole.member, TeamRole.guest}
+    )
+
+
+async def require_job_canceller(owner_id: uuid.UUID | None, team_id: uuid.UUID | None, user: User, db) -> None:
+    if owner_id == user.id or user.tier == Tier.Admin:
+        return
+    if team_id is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    await require_team_role(team_id, user, db, allowed={TeamRole.owner, TeamRole.admin})
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
 
 
 def forbid_if_guest(tm: TeamMember):
@@ -135,10 +261,15 @@ async def register(data: RegisterIn, db=Depends(get_db)):
     if existing.scalar_one_or_none():
         raise HTTPException(status_code=409, detail="Email already registered")
 
+    try:
+        password_hash = await hash_pool.hash(data.password)
+    except HashPoolBusy:
+        raise hash_pool_busy()
+
     u = User(
         email=str(data.email),
         username=data.username,
-        password_hash=hash_password(data.password),
+        password_hash=password_hash,
         tier=Tier.Free,
     )
     db.add(u)
@@ -169,7 +300,13 @@ async def login(data: LoginIn, db=Depends(get_db)):
 
     res = await db.execute(select(User).where(User.email == str(data.email)))
     u = res.scalar_one_or_none()
-    if not u or not u.password_hash or not verify_password(data.password, u.password_hash):
+    if not u or not u.password_hash:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    try:
+        ok = await hash_pool.verify(data.password, u.password_hash)
+    except HashPoolBusy:
+        raise hash_pool_busy()
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     u.last_login = db_utcnow()
@@ -296,6 +433,7 @@ async def create_team(data: TeamCreateIn, user: User = Depends(get_current_user)
     tm = TeamMember(team_id=t.id, user_id=user.id, role=TeamRole.owner)
     db.add(tm)
     await db.commit()
+    await invalidate_membership(user.id, t.id)
     return {"id": str(t.id), "name": t.name, "created_at": t.created_at}
 
 
@@ -341,6 +479,7 @@ async def join_team(data: JoinTeamIn, user: User = Depends(get_current_user), db
     except Exception:
         await db.rollback()
         raise HTTPException(status_code=409, detail="Already a team member")
+    await invalidate_membership(user.id, team.id)
     return {"ok": True, "team_id": str(team.id), "role": role.value}
 
 
@@ -365,6 +504,7 @@ async def create_project(data: ProjectCreateIn, user: User = Depends(get_current
     db.add(p)
     await db.commit()
     await db.refresh(p)
+    await ancestry_cache.set(f"project:{p.id}", str(p.team_id))
     return {"id": str(p.id), "team_id": str(p.team_id), "name": p.name, "description": p.description}
 
 
@@ -387,22 +527,20 @@ class TaskCreateIn(BaseModel):
 
 @api_router.post("/tasks")
 async def create_task(data: TaskCreateIn, user: User = Depends(get_current_user), db=Depends(get_db)):
-    from sqlalchemy import select
-
-    proj_res = await db.execute(select(Project).where(Project.id == data.project_id))
-    proj = proj_res.scalar_one_or_none()
-    if not proj:
+    team_id = await resolve_project_team(data.project_id, db)
+    if team_id is None:
         raise HTTPException(status_code=404, detail="Project not found")
 
     tm = await require_team_role(
-        proj.team_id, user, db, allowed={TeamRole.owner, TeamRole.admin, TeamRole.member, TeamRole.guest}
+        team_id, user, db, allowed={TeamRole.owner, TeamRole.admin, TeamRole.member, TeamRole.guest}
     )
     forbid_if_guest(tm)
 
-    t = Task(project_id=proj.id, title=data.title, description=data.description, created_by_user_id=user.id)
+    t = Task(project_id=data.project_id, title=data.title, description=data.description, created_by_user_id=user.id)
     db.add(t)
     await db.commit()
     await db.refresh(t)
+    await ancestry_cache.set(f"task:{t.id}", {"project_id": str(t.project_id), "team_id": str(team_id)})
     return {"id": str(t.id), "project_id": str(t.project_id), "title": t.title}
 
 
@@ -413,22 +551,17 @@ class CommentCreateIn(BaseModel):
 
 @api_router.post("/comments")
 async def create_comment(data: CommentCreateIn, user: User = Depends(get_current_user), db=Depends(get_db)):
-    from sqlalchemy import select
-
-    task_res = await db.execute(select(Task).where(Task.id == data.task_id))
-    task = task_res.scalar_one_or_none()
-    if not task:
+    ancestry = await resolve_task_ancestry(data.task_id, db)
+    if ancestry is None:
         raise HTTPException(status_code=404, detail="Task not found")
-
-    proj_res = await db.execute(select(Project).where(Project.id == task.project_id))
-    proj = proj_res.scalar_one()
+    _, team_id = ancestry
 
     tm = await require_team_role(
-        proj.team_id, user, db, allowed={TeamRole.owner, TeamRole.admin, TeamRole.member, TeamRole.guest}
+        team_id, user, db, allowed={TeamRole.owner, TeamRole.admin, TeamRole.member, TeamRole.guest}
     )
     forbid_if_guest(tm)
 
-    c = Comment(task_id=task.id, user_id=user.id, body=data.body)
+    c = Comment(task_id=data.task_id, user_id=user.id, body=data.body)
     db.add(c)
     await db.commit()
     await db.refresh(c)
@@ -473,23 +606,53 @@ async def mark_notification_read(data: MarkReadIn, user: User = Depends(get_curr
 
 
 # -----------------------------
-# Preview (enqueue immediately)
+# Preview (enqueued via outbox)
 # -----------------------------
 
 class PreviewCreateIn(BaseModel):
     project_id: uuid.UUID
     team_id: uuid.UUID
     device_id: str = Field(min_length=1, max_length=128)
+    # Identical revisions attach to the in-flight build instead of starting another
+    revision: Optional[str] = Field(default=None, max_length=128)
 
 
 @api_router.post("/preview/request")
-async def request_preview(data: PreviewCreateIn, user: User = Depends(get_current_user), db=Depends(get_db)):
+async def request_preview(
+    data: PreviewCreateIn, request: Request, user: User = Depends(get_current_user), db=Depends(get_db)
+):
+    return await idempotent(
+        request, user.id, "preview_request", data, lambda: _create_preview(data, user, db, request.app.state.redis)
+    )
+
+
+async def _create_preview(data: PreviewCreateIn, user: User, db, redis_client) -> dict[str, Any]:
     tm = await require_team_role(
         data.team_id, user, db, allowed={TeamRole.owner, TeamRole.admin, TeamRole.member, TeamRole.guest}
     )
     if tm.role == TeamRole.guest:
         raise HTTPException(status_code=403, detail="Guests cannot generate previews")
 
+    await lock_preview_slot(db, user.id, data.project_id, data.device_id)
+
+    if data.revision:
+        inflight = await find_inflight_preview(db, user.id, data.project_id, data.device_id, data.revision)
+        if inflight:
+            await db.commit()
+            registry.inc("preview_coalesced_total")
+            preview_token = create_preview_token(
+                preview_id=inflight.preview_id, user_id=str(user.id), device_id=data.device_id
+            )
+            return {
+                "preview_id": inflight.preview_id,
+                "preview_token": preview_token,
+                "status": inflight.status.value,
+                "coalesced": True,
+            }
+
+    # Coalesced requests add no work, so they are admitted even under load
+    await admission.check(redis_client, "preview", user.tier)
+
     preview_id = secrets.token_urlsafe(16)
 
     ps = PreviewSession(
@@ -498,40 +661,33 @@ async def request_preview(data: PreviewCreateIn, user: User = Depends(get_curren
         team_id=data.team_id,
         project_id=data.project_id,
         device_id=data.device_id,
+        revision=data.revision,
         status=JobStatus.queued,
         tier_snapshot=user.tier,
+        created_at=db_utcnow(),
     )
     db.add(ps)
-    await db.commit()
+    superseded = await supersede_queued_previews(db, user.id, data.project_id, data.device_id, preview_id)
 
     preview_token = create_preview_token(preview_id=preview_id, user_id=str(user.id), device_id=data.device_id)
 
-    # Enqueue immediately (explicit override)
-    try:
-        celery_app.send_task(
-            TASK_PREVIEW_REQUEST,
-            kwargs={
-                "preview_id": preview_id,
-                "preview_token": preview_token,
-                "user_id": str(user.id),
-                "team_id": str(data.team_id),
-                "project_id": str(data.project_id),
-                "device_id": data.device_id,
-                "tier_snapshot": user.tier.value,
-                "requested_at": ps.created_at.isoformat(),
-                "schema_version": 1,
-            },
-            queue=settings.WORKER_PREVIEW_QUEUE,
+    # Row and task commit together; the outbox relay publishes to the broker.
+    enqueue_preview(db, ps, preview_token)
+    await db.commit()
+    outbox_relay.notify()
+
+    for old_id in superseded:
+        await publish_job_event(
+            redis_client, PREVIEW, old_id, "status", status=JobStatus.cancelled.value, superseded_by=preview_id
         )
-    except Exception as e:
-        # Make failure visible and consistent
-        ps.status = JobStatus.failed
-        ps.error = f"enqueue_failed: {type(e).__name__}"
-        await db.commit()
-        logger.exception("Failed to enqueue preview task")
-        raise HTTPException(status_code=503, detail="Preview queue unavailable")
 
-    return {"preview_id": preview_id, "preview_token": preview_token, "status": ps.status.value}
+    return {
+        "preview_id": preview_id,
+        "preview_token": preview_token,
+        "status": ps.status.value,
+        "coalesced": False,
+        "superseded": superseded,
+    }
 
 
 class PreviewHeartbeatIn(BaseModel):
@@ -542,7 +698,7 @@ class PreviewHeartbeatIn(BaseModel):
 
 
 @api_router.post("/preview/heartbeat")
-async def preview_heartbeat(data: PreviewHeartbeatIn, db=Depends(get_db)):
+async def preview_heartbeat(data: PreviewHeartbeatIn, request: Request):
     try:
         payload = verify_preview_token(data.preview_token)
     except Exception:
@@ -552,18 +708,99 @@ async def preview_heartbeat(data: PreviewHeartbeatIn, db=Depends(get_db)):
     if not preview_id:
         raise HTTPException(status_code=401, detail="Invalid preview token")
 
+    # The signed token proves the preview exists; presence is Redis-only and
+    # written behind to PreviewSession by the presence flush task.
+    await record_heartbeat(request.app.state.redis, preview_id, str(data.client_id), data.last_event_at)
+    return {"ok": True, "preview_id": preview_id}
+
+
+async def _live_progress(redis_client, kind: str, job_id: str, status: JobStatus) -> Optional[dict[str, Any]]:
+    # Running jobs report through Redis; finished ones carry their final snapshot in the row.
+    if status != JobStatus.running:
+        return None
+    return await read_progress(redis_client, kind, job_id)
+
+
+def _preview_out(ps: PreviewSession, progress: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+    return {
+        "preview_id": ps.preview_id,
+        "status": ps.status.value,
+        "created_at": ps.created_at,
+        "started_at": ps.started_at,
+        "completed_at": ps.completed_at,
+        "error": ps.error,
+        "last_seen_at": ps.last_seen_at,
+        "active_clients": ps.active_clients,
+        "progress": progress or ps.progress,
+    }
+
+
+async def _get_preview(preview_id: str, db) -> PreviewSession | None:
     from sqlalchemy import select
 
     res = await db.execute(select(PreviewSession).where(PreviewSession.preview_id == preview_id))
-    ps = res.scalar_one_or_none()
+    return res.scalar_one_or_none()
+
+
+async def _readable_preview(preview_id: str, user: User, db) -> PreviewSession:
+    ps = await _get_preview(preview_id, db)
     if not ps:
         raise HTTPException(status_code=404, detail="Preview not found")
-
-    return {"ok": True, "preview_id": preview_id}
+    await require_job_reader(ps.user_id, ps.team_id, user, db)
+    return ps
+
+
+@api_router.get("/preview/{preview_id}")
+async def get_preview(preview_id: str, request: Request, user: User = Depends(get_current_user), db=Depends(get_db)):
+    ps = await _readable_preview(preview_id, user, db)
+    return _preview_out(ps, await _live_progress(request.app.state.redis, PREVIEW, preview_id, ps.status))
+
+
+@api_router.delete("/preview/{preview_id}")
+async def cancel_preview(preview_id: str, request: Request, user: User = Depends(get_current_user), db=Depends(get_db)):
+    ps = await _readable_preview(preview_id, user, db)
+    await require_job_canceller(ps.user_id, ps.team_id, user, db)
+
+    previous = await cancel_job(db, PreviewSession, PreviewSession.preview_id == preview_id, preview_id)
+    if previous is None:
+        raise HTTPException(status_code=409, detail="Preview already finished")
+    # Interrupts the build if a worker is running it
+    await request_cancel(request.app.state.redis, PREVIEW, preview_id)
+    return {"preview_id": preview_id, "status": JobStatus.cancelled.value, "previous_status": previous.value}
+
+
+@api_router.get("/preview/{preview_id}/presence")
+async def get_preview_presence(
+    preview_id: str, request: Request, user: User = Depends(get_current_user), db=Depends(get_db)
+):
+    await _readable_preview(preview_id, user, db)
+    clients = await active_clients(request.app.state.redis, preview_id)
+    return {"preview_id": preview_id, "active_clients": clients}
+
+
+@api_router.get("/preview/{preview_id}/events")
+async def stream_preview_events(
+    preview_id: str, request: Request, user: User = Depends(get_current_user), db=Depends(get_db)
+):
+    await _readable_preview(preview_id, user, db)
+
+    async def snapshot():
+        # The request session is closed once streaming starts
+        async with AsyncSessionLocal() as session:
+            ps = await _get_preview(preview_id, session)
+        if not ps:
+            return None
+        return _preview_out(ps, await _live_progress(request.app.state.redis, PREVIEW, preview_id, ps.status))
+
+    return StreamingResponse(
+        sse_job_stream(request, job_channel(PREVIEW, preview_id), snapshot),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
 
 
 # -----------------------------
-# AI Jobs (enqueue immediately)
+# AI Jobs (enqueued via outbox)
 # -----------------------------
 
 class AIJobCreateIn(BaseModel):
@@ -574,16 +811,31 @@ class AIJobCreateIn(BaseModel):
 
 
 @api_router.post("/ai/jobs")
-async def submit_ai_job(data: AIJobCreateIn, user: User = Depends(get_current_user), db=Depends(get_db)):
-    team_id = data.team_id
-    if team_id:
-        tm = await require_team_role(
-            team_id, user, db, allowed={TeamRole.owner, TeamRole.admin, TeamRole.member, TeamRole.guest}
-        )
-        if tm.role == TeamRole.guest:
-            raise HTTPException(status_code=403, detail="Guests cannot run AI jobs")
+async def submit_ai_job(
+    data: AIJobCreateIn, request: Request, user: User = Depends(get_current_user), db=Depends(get_db)
+):
+    return await idempotent(
+        request, user.id, "ai_jobs", data, lambda: _create_ai_job(data, user, db, request.app.state.redis)
+    )
+
+
+async def _create_ai_job(data: AIJobCreateIn, user: User, db, redis_client) -> dict[str, Any]:
+    # The project decides the team; results are cached per team, so the caller
+    # must be able to run jobs there before anything is looked up.
+    team_id = await resolve_project_team(data.project_id, db)
+    if team_id is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if data.team_id and data.team_id != team_id:
+        raise HTTPException(status_code=400, detail="Project does not belong to team")
+    tm = await require_team_role(
+        team_id, user, db, allowed={TeamRole.owner, TeamRole.admin, TeamRole.member, TeamRole.guest}
+    )
+    if tm.role == TeamRole.guest:
+        raise HTTPException(status_code=403, detail="Guests cannot run AI jobs")
 
+    now = db_utcnow()
     job = AIJob(
+        id=uuid.uuid4(),
         user_id=user.id,
         team_id=team_id,
         project_id=data.project_id,
@@ -591,35 +843,91 @@ async def submit_ai_job(data: AIJobCreateIn, user: User = Depends(get_current_us
         tier_snapshot=user.tier,
         job_type=data.job_type,
         params={"selection": data.selection},
+        created_at=now,
+    )
+
+    cached = await get_result(
+        redis_client,
+        result_cache_key(cache_scope(team_id, user.id), data.job_type, data.selection, data.project_id),
     )
+    if cached is not None:
+        # Identical inputs already computed: finish here, never enqueue.
+        job.status = JobStatus.succeeded
+        job.result = cached
+        job.started_at = now
+        job.completed_at = now
+        db.add(job)
+        await db.commit()
+        return {"id": str(job.id), "status": job.status.value, "cached": True}
+
+    await admission.check(redis_client, "ai", user.tier)
+
     db.add(job)
+    enqueue_ai_job(db, job)
     await db.commit()
-    await db.refresh(job)
+    outbox_relay.notify()
+
+    return {"id": str(job.id), "status": job.status.value, "cached": False}
+
+
+def _ai_job_out(job: AIJob, progress: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+    return {
+        "id": str(job.id),
+        "job_type": job.job_type,
+        "status": job.status.value,
+        "result": job.result,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "completed_at": job.completed_at,
+        "error": job.error,
+        "progress": progress or job.progress,
+    }
+
+
+async def _readable_ai_job(job_id: uuid.UUID, user: User, db) -> AIJob:
+    job = await db.get(AIJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="AI job not found")
+    await require_job_reader(job.user_id, job.team_id, user, db)
+    return job
+
+
+@api_router.get("/ai/jobs/{job_id}")
+async def get_ai_job(job_id: uuid.UUID, request: Request, user: User = Depends(get_current_user), db=Depends(get_db)):
+    job = await _readable_ai_job(job_id, user, db)
+    return _ai_job_out(job, await _live_progress(request.app.state.redis, AI, str(job_id), job.status))
 
-    try:
-        celery_app.send_task(
-            TASK_AI_JOB_RUN,
-            kwargs={
-                "job_id": str(job.id),
-                "job_type": job.job_type,
-                "user_id": str(user.id),
-                "team_id": str(team_id) if team_id else None,
-                "project_id": str(data.project_id),
-                "tier_snapshot": user.tier.value,
-                "selection": data.selection,
-                "requested_at": job.created_at.isoformat(),
-                "schema_version": 1,
-            },
-            queue=settings.WORKER_AI_QUEUE,
-        )
-    except Exception as e:
-        job.status = JobStatus.failed
-        job.error = f"enqueue_failed: {type(e).__name__}"
-        await db.commit()
-        logger.exception("Failed to enqueue AI job task")
-        raise HTTPException(status_code=503, detail="AI queue unavailable")
 
-    return {"id": str(job.id), "status": job.status.value}
+@api_router.delete("/ai/jobs/{job_id}")
+async def cancel_ai_job(job_id: uuid.UUID, request: Request, user: User = Depends(get_current_user), db=Depends(get_db)):
+    job = await _readable_ai_job(job_id, user, db)
+    await require_job_canceller(job.user_id, job.team_id, user, db)
+
+    previous = await cancel_job(db, AIJob, AIJob.id == job_id, str(job_id))
+    if previous is None:
+        raise HTTPException(status_code=409, detail="AI job already finished")
+    await request_cancel(request.app.state.redis, AI, str(job_id))
+    return {"id": str(job_id), "status": JobStatus.cancelled.value, "previous_status": previous.value}
+
+
+@api_router.get("/ai/jobs/{job_id}/events")
+async def stream_ai_job_events(
+    job_id: uuid.UUID, request: Request, user: User = Depends(get_current_user), db=Depends(get_db)
+):
+    await _readable_ai_job(job_id, user, db)
+
+    async def snapshot():
+        async with AsyncSessionLocal() as session:
+            job = await session.get(AIJob, job_id)
+        if not job:
+            return None
+        return _ai_job_out(job, await _live_progress(request.app.state.redis, AI, str(job_id), job.status))
+
+    return StreamingResponse(
+        sse_job_stream(request, job_channel(AI, str(job_id)), snapshot),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
 
 
 # -----------------------------
@@ -736,4 +1044,5 @@ async def billing_webhook(request: Request, db=Depends(get_db)):
             user.tier = tier
 
     await db.commit()
+    await principal_cache.invalidate(str(user.id))
     return {"ok": True}
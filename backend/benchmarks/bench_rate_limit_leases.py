@@ -0,0 +1,52 @@
+"""
+Redis round trips per 10k rate-limit checks: "redis" vs "hybrid" mode.
+Needs a reachable Redis (settings.redis_url); uses a throwaway key prefix.
+
+    python -m backend.benchmarks.bench_rate_limit_leases [requests] [keys]
+"""
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+import uuid
+
+import redis.asyncio as redis
+
+from backend.app.config import settings
+from backend.app.rate_limit import RedisRateLimiter
+
+LIMIT = 1200
+WINDOW_SECONDS = 60
+
+
+async def _run(client: redis.Redis, mode: str, requests: int, keys: int, **kwargs) -> None:
+    limiter = RedisRateLimiter(client, mode=mode, **kwargs)
+    prefix = f"bench:{uuid.uuid4().hex[:8]}"
+    allowed = 0
+    start = time.perf_counter()
+    for i in range(requests):
+        res = await limiter.hit(f"{prefix}:{i % keys}", LIMIT, WINDOW_SECONDS)
+        allowed += res.allowed
+    elapsed = time.perf_counter() - start
+    label = mode if mode == "redis" else f"{mode} lease={limiter.lease_size}"
+    print(
+        f"{label:<22} requests={requests} allowed={allowed} redis_calls={limiter.redis_calls} "
+        f"saved={requests - limiter.redis_calls} ({(1 - limiter.redis_calls / requests) * 100:.1f}%) "
+        f"{elapsed / requests * 1e6:.1f} us/check"
+    )
+
+
+async def main(requests: int = 10000, keys: int = 10) -> None:
+    client = redis.from_url(settings.redis_url, decode_responses=True)
+    try:
+        await _run(client, "redis", requests, keys)
+        for lease_size in (5, 20, 50):
+            await _run(client, "hybrid", requests, keys, lease_size=lease_size, lease_max_fraction=1.0)
+    finally:
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    asyncio.run(main(*args))
@@ -0,0 +1,59 @@
+"""
+Tasks/second for a DB-touching worker task: asyncio.run() per task (the old
+worker pattern, fresh loop and connection every time) vs. WorkerRuntime (one
+loop and warm pool per process). Needs a reachable Postgres.
+
+    python -m backend.benchmarks.bench_worker_runtime [tasks]
+"""
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from backend.app.config import settings
+from backend.common.worker_runtime import WorkerRuntime
+
+
+async def _task(session_factory) -> None:
+    async with session_factory() as session:
+        await session.execute(text("SELECT 1"))
+        await session.commit()
+
+
+def bench_asyncio_run(tasks: int) -> float:
+    # A pooled engine can't be shared across asyncio.run() loops, so the old
+    # pattern effectively pays for a new connection per task.
+    engine = create_async_engine(settings.database_url, poolclass=NullPool)
+    factory = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    start = time.perf_counter()
+    for _ in range(tasks):
+        asyncio.run(_task(factory))
+    return tasks / (time.perf_counter() - start)
+
+
+def bench_runtime(tasks: int) -> float:
+    runtime = WorkerRuntime("bench")
+    runtime.run(_task(runtime.session))  # warm the pool
+    start = time.perf_counter()
+    for _ in range(tasks):
+        runtime.run(_task(runtime.session))
+    rate = tasks / (time.perf_counter() - start)
+    runtime.shutdown()
+    return rate
+
+
+def main(tasks: int = 500) -> None:
+    before = bench_asyncio_run(tasks)
+    after = bench_runtime(tasks)
+    print(f"asyncio.run per task : {before:8.1f} tasks/s")
+    print(f"WorkerRuntime        : {after:8.1f} tasks/s")
+    print(f"speedup              : {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
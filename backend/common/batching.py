@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Generic, Optional, TypeVar
+
+from backend.common.metrics import registry
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+BATCH_LINGER_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+@dataclass
+class _OpenBatch:
+    opened: float
+    entries: list[tuple[Any, asyncio.Future]] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Coalesces concurrent submissions on one event loop into batched calls.
+
+    submit(key, item) joins the open batch for `key`; the batch is handed to
+    `handler(key, items)` once it holds `max_size` items or `linger` seconds
+    after it opened, whichever comes first. The handler returns one result per
+    item, in order; a result that is an exception instance is raised to that
+    item's submitter only. Cancelling a submitter drops its item if the batch
+    hasn't started yet, and otherwise just discards its result.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[str, list[T]], Awaitable[list[Any]]],
+        limits: Callable[[str], tuple[int, float]],
+    ):
+        self.name = name
+        self.handler = handler
+        self.limits = limits  # key -> (max_size, linger_seconds)
+        self._open: dict[str, _OpenBatch] = {}
+        self._running: set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        return sum(len(b.entries) for b in self._open.values())
+
+    async def submit(self, key: str, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        max_size, linger = self.limits(key)
+        fut = loop.create_future()
+        batch = self._open.get(key)
+        if batch is None:
+            batch = self._open[key] = _OpenBatch(opened=time.monotonic())
+            if max_size > 1:
+                batch.timer = loop.call_later(linger, self._flush, key, batch, "linger")
+        batch.entries.append((item, fut))
+        if len(batch.entries) >= max_size:
+            self._flush(key, batch, "size")
+        return await fut
+
+    def _flush(self, key: str, batch: _OpenBatch, trigger: str) -> None:
+        if self._open.get(key) is batch:
+            del self._open[key]
+        if batch.timer is not None:
+            batch.timer.cancel()
+        live = [(item, fut) for item, fut in batch.entries if not fut.done()]
+        if not live:
+            return
+        registry.inc("batches_total", batcher=self.name, key=key, trigger=trigger)
+        registry.observe("batch_size", len(live), buckets=BATCH_SIZE_BUCKETS, batcher=self.name, key=key)
+        registry.observe(
+            "batch_linger_seconds",
+            time.monotonic() - batch.opened,
+            buckets=BATCH_LINGER_BUCKETS,
+            batcher=self.name,
+            key=key,
+        )
+        task = asyncio.get_running_loop().create_task(self._run(key, live))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, key: str, entries: list[tuple[Any, asyncio.Future]]) -> None:
+        try:
+            results = await self.handler(key, [item for item, _ in entries])
+            if len(results) != len(entries):
+                raise RuntimeError(f"{self.name} handler returned {len(results)} results for {len(entries)} items")
+        except asyncio.CancelledError:
+            for _, fut in entries:
+                fut.cancel()
+            raise
+        except Exception as exc:
+            for _, fut in entries:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+        for (_, fut), res in zip(entries, results):
+            if fut.done():
+                continue
+            if isinstance(res, BaseException):
+                fut.set_exception(res)
+            else:
+                fut.set_result(res)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from backend.app.db import JobStatus
+from backend.common.events import publish_job_event
+from backend.common.metrics import registry
+
+logger = logging.getLogger("hivesync.cancellation")
+
+# Cooperative cancellation of running jobs.
+#
+# The API marks the row cancelled (bumping its fencing token), sets
+# cancel:<kind>:<id>, publishes the job id on the cancel:<kind> channel and a
+# "cancelled" status event for streaming clients. Each worker process runs a
+# CancellationWatcher on its runtime loop subscribed only to cancel:<kind>, so
+# it never sees ordinary status/progress traffic: a cancel for a job it is
+# running cancels that job's task immediately, and the flag is checked at
+# explicit checkpoints and before work starts, in case the message was missed.
+
+CANCEL_FLAG_TTL_SECONDS = 86400
+
+
+class JobCancelled(Exception):
+    """The job was cancelled by its owner; stop without writing results."""
+
+
+def cancel_key(kind: str, job_id: str) -> str:
+    return f"cancel:{kind}:{job_id}"
+
+
+def cancel_channel(kind: str) -> str:
+    return f"cancel:{kind}"
+
+
+async def request_cancel(redis_client, kind: str, job_id: str) -> None:
+    await redis_client.set(cancel_key(kind, str(job_id)), "1", ex=CANCEL_FLAG_TTL_SECONDS)
+    await redis_client.publish(cancel_channel(kind), str(job_id))
+    await publish_job_event(redis_client, kind, job_id, "status", status=JobStatus.cancelled.value)
+
+
+class CancellationWatcher:
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._running: dict[str, asyncio.Task] = {}
+        self._cancelled: set[asyncio.Task] = set()
+
+    async def checkpoint(self, redis_client, job_id: str) -> None:
+        """Raise JobCancelled if the job has been cancelled. Call between units of work."""
+        try:
+            flagged = await redis_client.exists(cancel_key(self.kind, job_id))
+        except Exception:
+            logger.warning("Cancellation check failed for %s %s", self.kind, job_id, exc_info=True)
+            return
+        if flagged:
+            registry.inc("jobs_cancelled_total", kind=self.kind, at="checkpoint")
+            raise JobCancelled(f"{self.kind} {job_id} cancelled")
+
+    @asynccontextmanager
+    async def watch(self, redis_client, job_id: str) -> AsyncIterator[None]:
+        """Make the current task interruptible by a cancel event for job_id."""
+        job_id = str(job_id)
+        await self.checkpoint(redis_client, job_id)
+        task = asyncio.current_task()
+        self._running[job_id] = task
+        try:
+            yield
+        except asyncio.CancelledError:
+            if task not in self._cancelled:
+                raise
+            task.uncancel()
+            raise JobCancelled(f"{self.kind} {job_id} cancelled") from None
+        finally:
+            self._running.pop(job_id, None)
+            self._cancelled.discard(task)
+
+    def _interrupt(self, job_id: str) -> None:
+        task = self._running.get(job_id)
+        if task is None or task.done() or task in self._cancelled:
+            return
+        self._cancelled.add(task)
+        task.cancel()
+        registry.inc("jobs_cancelled_total", kind=self.kind, at="interrupt")
+        logger.info("Interrupting cancelled %s %s", self.kind, job_id)
+
+    async def run_forever(self, redis_client) -> None:
+        channel = cancel_channel(self.kind)
+        while True:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(channel)
+                async for msg in pubsub.listen():
+                    job_id = msg["data"]
+                    self._interrupt(job_id.decode() if isinstance(job_id, bytes) else str(job_id))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Cancellation watcher lost its subscription; resubscribing", exc_info=True)
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.app.config import settings
+from backend.app.db import JobStatus, Tier
+from backend.common.metrics import registry
+
+# Absolute deadlines for queued work.
+#
+# Every task payload carries deadline_at, derived from the job kind, tier and
+# (for AI) job type and counted from when the job was requested. It is stored
+# on the row at first enqueue, so re-enqueues by the recovery sweep keep the
+# original budget; only an explicit DLQ replay starts a new one. A worker that receives a task past its
+# deadline marks the row failed with "deadline_exceeded" and acks without
+# claiming, so a backlog left by an outage drains quickly instead of replaying
+# work nobody is waiting for any more.
+
+DEADLINE_ERROR = "deadline_exceeded"
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def preview_deadline(tier: Tier | str, start: datetime) -> datetime:
+    return start + timedelta(seconds=settings.PREVIEW_DEADLINE_SECONDS.get(Tier(tier).value, 900))
+
+
+def ai_job_deadline(tier: Tier | str, job_type: str, start: datetime) -> datetime:
+    seconds = settings.AI_JOB_DEADLINE_SECONDS.get(Tier(tier).value, 3600)
+    override = settings.AI_JOB_TYPE_DEADLINE_SECONDS.get(job_type)
+    if override is not None:
+        seconds = min(seconds, override)
+    return start + timedelta(seconds=seconds)
+
+
+def is_expired(payload: dict[str, Any]) -> bool:
+    deadline_at = payload.get("deadline_at")
+    if not deadline_at:
+        return False
+    try:
+        return utcnow() > datetime.fromisoformat(deadline_at)
+    except ValueError:
+        return False
+
+
+def record_expired(kind: str, payload: dict[str, Any]) -> None:
+    registry.inc("tasks_expired_total", kind=kind, tier=payload.get("tier_snapshot") or Tier.Free.value)
+
+
+async def expire_job(session: AsyncSession, model, where) -> bool:
+    """Fail a still-queued row whose task missed its deadline. Returns True if a row changed."""
+    res = await session.execute(
+        update(model)
+        .where(where, model.status == JobStatus.queued)
+        .values(status=JobStatus.failed, error=DEADLINE_ERROR, completed_at=utcnow())
+        .returning(model.id)
+        .execution_options(synchronize_session=False)
+    )
+    changed = res.scalar_one_or_none() is not None
+    await session.commit()
+    return changed
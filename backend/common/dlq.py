@@ -1,10 +1,33 @@
 from __future__ import annotations
 
+import hashlib
+import re
 from typing import Any, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.app.db import DeadLetter
 
+# Variable parts of error messages, replaced so that one failure mode yields
+# one fingerprint regardless of ids, numbers or quoted values.
+_NORMALIZERS = [
+    (re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"), "<uuid>"),
+    (re.compile(r"'[^']*'|\"[^\"]*\""), "<str>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b|\b[0-9a-fA-F]{16,}\b"), "<hex>"),
+    (re.compile(r"\b[A-Za-z0-9_-]{20,}\b"), "<id>"),
+    (re.compile(r"\d+(\.\d+)?"), "<n>"),
+]
+
+
+def normalize_error_message(message: str) -> str:
+    for pattern, repl in _NORMALIZERS:
+        message = pattern.sub(repl, message)
+    return " ".join(message.split())[:500]
+
+
+def error_fingerprint(task_name: str, error_type: str, error_message: str) -> str:
+    key = f"{task_name}|{error_type}|{normalize_error_message(error_message)}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
 
 async def write_dead_letter(
     session: AsyncSession,
@@ -26,6 +49,7 @@ async def write_dead_letter(
         attempts=attempts,
         error_type=error_type,
         error_message=error_message,
+        fingerprint=error_fingerprint(task_name, error_type, error_message),
         payload=payload,
         preview_id=preview_id,
         ai_job_id=ai_job_id,
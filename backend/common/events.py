@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from typing import Any
+
+logger = logging.getLogger("hivesync.events")
+
+# Job status/progress events. Workers PUBLISH to jobs:<kind>:<id>; each API
+# process holds one pattern subscription and fans events out to its streaming
+# clients. Delivery is best-effort: clients get a DB snapshot on connect.
+
+JOB_EVENTS_PATTERN = "jobs:*"
+
+PREVIEW = "preview"
+AI = "ai"
+
+
+def job_channel(kind: str, job_id: str) -> str:
+    return f"jobs:{kind}:{job_id}"
+
+
+async def publish_job_event(redis_client, kind: str, job_id: str, event: str, **data: Any) -> None:
+    msg = {"kind": kind, "id": str(job_id), "event": event, "ts": time.time(), **data}
+    try:
+        await redis_client.publish(job_channel(kind, str(job_id)), json.dumps(msg, default=str))
+    except Exception:
+        logger.warning("Failed to publish %s event for %s %s", event, kind, job_id, exc_info=True)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, TypeVar
+
+from backend.common.metrics import registry
+
+T = TypeVar("T")
+
+
+class FairScheduler:
+    """
+    Admission control for coroutines sharing one event loop.
+
+    At most `max_concurrent` run at once (and at most `max_per_key` per key,
+    0 = no per-key cap). When a slot frees up, waiting keys are served
+    round-robin, so one busy key (e.g. an AI job_type) cannot starve the rest.
+    `cancel_all()` cancels everything running or waiting, for shutdown.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_per_key: int = 0):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_per_key = max_per_key
+        self._active = 0
+        self._active_by_key: dict[str, int] = {}
+        self._waiters: OrderedDict[str, deque[asyncio.Future]] = OrderedDict()
+        self._running: set[asyncio.Task] = set()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(q) for q in self._waiters.values())
+
+    def _key_has_room(self, key: str) -> bool:
+        return not self.max_per_key or self._active_by_key.get(key, 0) < self.max_per_key
+
+    def _take(self, key: str) -> None:
+        self._active += 1
+        self._active_by_key[key] = self._active_by_key.get(key, 0) + 1
+
+    def _release(self, key: str) -> None:
+        self._active -= 1
+        left = self._active_by_key.get(key, 1) - 1
+        if left:
+            self._active_by_key[key] = left
+        else:
+            self._active_by_key.pop(key, None)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._active < self.max_concurrent and self._waiters:
+            for key in list(self._waiters):
+                if self._key_has_room(key):
+                    break
+            else:
+                return
+            q = self._waiters.pop(key)
+            fut = q.popleft()
+            if q:
+                # Re-insert at the end: this key goes to the back of the rotation.
+                self._waiters[key] = q
+            if fut.done():
+                continue
+            self._take(key)
+            fut.set_result(None)
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        registry.set_gauge("scheduler_active", self._active, scheduler=self.name)
+        registry.set_gauge("scheduler_waiting", self.waiting, scheduler=self.name)
+
+    async def _acquire(self, key: str) -> None:
+        if self._active < self.max_concurrent and self._key_has_room(key) and not self._waiters:
+            self._take(key)
+            self._update_gauges()
+            return
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, deque()).append(fut)
+        self._update_gauges()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Slot was handed to us just as we were cancelled.
+                self._release(key)
+            else:
+                q = self._waiters.get(key)
+                if q is not None and fut in q:
+                    q.remove(fut)
+                    if not q:
+                        self._waiters.pop(key, None)
+                self._update_gauges()
+            raise
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        task = asyncio.current_task()
+        self._running.add(task)
+        try:
+            await self._acquire(key)
+            try:
+                return await factory()
+            finally:
+                self._release(key)
+        finally:
+            self._running.discard(task)
+
+    def cancel_all(self) -> None:
+        for task in list(self._running):
+            task.cancel()
+
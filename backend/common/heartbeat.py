@@ -1,40 +1,108 @@
 from __future__ import annotations
 
-import uuid
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Callable, Optional
 
-from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.app.config import settings
 from backend.app.db import Worker
 
+logger = logging.getLogger("hivesync.heartbeat")
+
+# Worker liveness.
+#
+# Every worker process beats into Redis from its runtime loop:
+#   worker:alive:<worker_id>  STRING beat JSON, expires after WORKER_LIVENESS_TTL_SECONDS
+#   workers:alive             ZSET worker_id -> last beat, for enumeration
+# A process that stops beating simply expires. Postgres only gets a history
+# row per worker, written by the recovery sweep as one batched upsert.
+
+ALIVE_INDEX_KEY = "workers:alive"
+
 
 def utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
-async def heartbeat(
-    session: AsyncSession,
-    *,
-    worker_id: str,
-    kind: str,
-    metadata: dict[str, Any] | None = None,
-) -> None:
-    res = await session.execute(
-        select(Worker).where(Worker.worker_id == worker_id)
+def alive_key(worker_id: str) -> str:
+    return f"worker:alive:{worker_id}"
+
+
+class HeartbeatPublisher:
+    def __init__(self, kind: str, worker_prefix: str, metadata: Optional[Callable[[], dict[str, Any]]] = None):
+        self.kind = kind
+        self.worker_prefix = worker_prefix
+        self.metadata = metadata
+        self.worker_id: Optional[str] = None
+
+    async def beat(self, redis_client) -> None:
+        now = time.time()
+        payload = {
+            "worker_id": self.worker_id,
+            "kind": self.kind,
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "last_beat": now,
+            **(self.metadata() if self.metadata else {}),
+        }
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.set(alive_key(self.worker_id), json.dumps(payload), ex=settings.WORKER_LIVENESS_TTL_SECONDS)
+        pipe.zadd(ALIVE_INDEX_KEY, {self.worker_id: now})
+        await pipe.execute()
+
+    async def run_forever(self, redis_client) -> None:
+        # Resolved here, after any fork: one identity per process.
+        self.worker_id = f"{self.worker_prefix}-{os.getpid()}"
+        while True:
+            try:
+                await self.beat(redis_client)
+            except Exception:
+                logger.warning("Heartbeat failed for %s", self.worker_id, exc_info=True)
+            await asyncio.sleep(settings.WORKER_HEARTBEAT_INTERVAL_SECONDS)
+
+
+async def read_alive(redis_client) -> list[dict[str, Any]]:
+    """Beats of every live worker; prunes index entries whose key has expired."""
+    await redis_client.zremrangebyscore(
+        ALIVE_INDEX_KEY, "-inf", time.time() - settings.WORKER_LIVENESS_TTL_SECONDS
+    )
+    ids = await redis_client.zrange(ALIVE_INDEX_KEY, 0, -1)
+    if not ids:
+        return []
+    raw = await redis_client.mget([alive_key(i) for i in ids])
+    return [json.loads(r) for r in raw if r]
+
+
+async def upsert_workers(session: AsyncSession, beats: list[dict[str, Any]]) -> int:
+    """Persist live workers in one INSERT ... ON CONFLICT statement."""
+    if not beats:
+        return 0
+    rows = [
+        {
+            "worker_id": b["worker_id"],
+            "kind": b["kind"],
+            "last_heartbeat_at": datetime.fromtimestamp(b["last_beat"], tz=timezone.utc),
+            "metadata_": {k: v for k, v in b.items() if k not in ("worker_id", "kind", "last_beat")},
+        }
+        for b in beats
+    ]
+    stmt = insert(Worker).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Worker.worker_id],
+        set_={
+            "kind": stmt.excluded.kind,
+            "last_heartbeat_at": stmt.excluded.last_heartbeat_at,
+            "metadata_": stmt.excluded.metadata_,
+        },
     )
-    w = res.scalar_one_or_none()
-    if not w:
-        w = Worker(
-            worker_id=worker_id,
-            kind=kind,
-            last_heartbeat_at=utcnow(),
-            metadata=metadata or {},
-        )
-        session.add(w)
-    else:
-        w.last_heartbeat_at = utcnow()
-        if metadata is not None:
-            w.metadata = metadata
+    await session.execute(stmt)
     await session.commit()
+    return len(rows)
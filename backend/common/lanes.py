@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+from kombu import Queue
+from kombu.utils.scheduling import round_robin_cycle
+
+from backend.app.config import settings
+from backend.app.db import Tier
+from backend.common.metrics import registry
+
+logger = logging.getLogger("hivesync.lanes")
+
+# Tier priority lanes.
+#
+# Tasks are routed to <queue>.<tier> (e.g. ai_tasks.premium). Workers consume
+# every lane of their queue plus the bare queue (legacy/DLQ replays, weighted
+# like Free). kombu's Redis transport BRPOPs the lanes in the order our cycle
+# returns, taking from the first non-empty one; WeightedLaneCycle orders them
+# by smooth weighted round-robin credit, charged to the lane that actually
+# delivered, so each lane gets its weighted share while it has work.
+
+QUEUE_WAIT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0, 60.0, 120.0, 300.0, 900.0)
+
+
+def lane_queue(base: str, tier: Tier | str | None) -> str:
+    if not settings.TIER_LANES_ENABLED or tier is None:
+        return base
+    return f"{base}.{Tier(tier).value.lower()}"
+
+
+def lane_queues(base: str) -> list[Queue]:
+    """Queues a worker for `base` consumes, highest weight first."""
+    tiers = sorted(Tier, key=lambda t: -tier_weight(t))
+    return [Queue(lane_queue(base, t)) for t in tiers] + [Queue(base)]
+
+
+def tier_weight(tier: Tier | str) -> int:
+    return max(1, int(settings.TIER_LANE_WEIGHTS.get(Tier(tier).value, 1)))
+
+
+def tier_slo_seconds(tier: Tier | str) -> float:
+    return float(settings.TIER_QUEUE_SLO_SECONDS.get(Tier(tier).value, 60.0))
+
+
+def _lane_tier(queue: str) -> Optional[Tier]:
+    suffix = queue.rsplit(".", 1)[-1] if "." in queue else ""
+    for t in Tier:
+        if t.value.lower() == suffix:
+            return t
+    return None
+
+
+def _lane_weight(queue: str) -> int:
+    tier = _lane_tier(queue)
+    return tier_weight(tier) if tier else tier_weight(Tier.Free)
+
+
+class WeightedLaneCycle(round_robin_cycle):
+    """
+    kombu queue_order_strategy. Set
+    broker_transport_options={"queue_order_strategy": "backend.common.lanes:WeightedLaneCycle"}.
+    """
+
+    def __init__(self, it=None):
+        super().__init__(it)
+        self.credit: dict[str, float] = {}
+
+    def update(self, it):
+        super().update(it)
+        self.credit = {q: self.credit.get(q, 0.0) for q in self.items}
+
+    def consume(self, n):
+        # Highest projected credit first; BRPOP falls through empty lanes.
+        return sorted(self.items, key=lambda q: -(self.credit.get(q, 0.0) + _lane_weight(q)))[:n]
+
+    def rotate(self, last_used):
+        if last_used not in self.credit:
+            return last_used
+        total = sum(_lane_weight(q) for q in self.items)
+        for q in self.items:
+            self.credit[q] += _lane_weight(q)
+        self.credit[last_used] -= total
+        # Bound credit so a long-idle lane cannot monopolise the worker later.
+        for q in self.items:
+            self.credit[q] = max(-total, min(total, self.credit[q]))
+        return last_used
+
+
+def queue_wait_labels(kind: str, payload: dict[str, Any]) -> dict[str, str]:
+    return {"kind": kind, "tier": payload.get("tier_snapshot") or Tier.Free.value}
+
+
+def observe_queue_wait(kind: str, payload: dict[str, Any]) -> Optional[float]:
+    """Record broker queue wait for a first delivery and count SLO breaches."""
+    enqueued_at = payload.get("enqueued_at")
+    if not enqueued_at:
+        return None
+    try:
+        wait = (datetime.now(timezone.utc) - datetime.fromisoformat(enqueued_at)).total_seconds()
+    except ValueError:
+        return None
+    labels = queue_wait_labels(kind, payload)
+    registry.observe("queue_wait_seconds", max(0.0, wait), buckets=QUEUE_WAIT_BUCKETS, **labels)
+    slo = payload.get("slo_seconds")
+    if slo is not None and wait > float(slo):
+        registry.inc("queue_slo_breaches_total", **labels)
+    return wait
+
+
+def all_lane_names(bases: Iterable[str]) -> list[str]:
+    return [q.name for base in bases for q in lane_queues(base)]
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+
+from sqlalchemy import Integer, and_, column, or_, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.app.db import JobStatus
+from backend.common.metrics import registry
+
+logger = logging.getLogger("hivesync.leases")
+
+# Lease-based claiming for PreviewSession / AIJob rows.
+#
+# A claim atomically moves a queued row (or a running row whose lease lapsed)
+# to running and bumps its fencing token. Every later write by the claimant is
+# conditioned on that token, so a redelivered duplicate, a zombie worker or a
+# recovery-requeued copy can never overwrite the current owner's result.
+
+
+class StaleLeaseError(Exception):
+    """The row is now owned by a newer claim (or was recovered); the write was rejected."""
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class Lease:
+    model: Any
+    row: Any
+    token: int
+    owner: str
+    seconds: int
+
+    @property
+    def fenced(self):
+        m = self.model
+        return and_(m.id == self.row.id, m.fencing_token == self.token, m.status == JobStatus.running)
+
+
+async def claim(session: AsyncSession, model, where, *, owner: str, seconds: int) -> Optional[Lease]:
+    now = utcnow()
+    res = await session.execute(
+        update(model)
+        .where(
+            where,
+            or_(
+                model.status == JobStatus.queued,
+                and_(model.status == JobStatus.running, model.lease_expires_at < now),
+            ),
+        )
+        .values(
+            status=JobStatus.running,
+            lease_owner=owner,
+            fencing_token=model.fencing_token + 1,
+            started_at=now,
+            lease_expires_at=now + timedelta(seconds=seconds),
+        )
+        .returning(model)
+        .execution_options(synchronize_session=False)
+    )
+    row = res.scalar_one_or_none()
+    await session.commit()
+    if row is None:
+        return None
+    registry.inc("lease_claims_total", model=model.__tablename__)
+    return Lease(model=model, row=row, token=row.fencing_token, owner=owner, seconds=seconds)
+
+
+async def _fenced_update(session: AsyncSession, lease: Lease, **values: Any) -> bool:
+    res = await session.execute(
+        update(lease.model)
+        .where(lease.fenced)
+        .values(**values)
+        .returning(lease.model.id)
+        .execution_options(synchronize_session=False)
+    )
+    ok = res.scalar_one_or_none() is not None
+    await session.commit()
+    return ok
+
+
+async def renew(session: AsyncSession, lease: Lease) -> bool:
+    return await _fenced_update(session, lease, lease_expires_at=utcnow() + timedelta(seconds=lease.seconds))
+
+
+async def complete(session: AsyncSession, lease: Lease, **values: Any) -> None:
+    """Write the final state; raises StaleLeaseError if the fencing token is no longer current."""
+    if not await _fenced_update(session, lease, lease_owner=None, lease_expires_at=None, **values):
+        registry.inc("lease_stale_writes_total", model=lease.model.__tablename__)
+        raise StaleLeaseError(f"{lease.model.__tablename__} {lease.row.id}: fencing token {lease.token} is stale")
+
+
+async def complete_many(
+    session: AsyncSession, model, entries: list[tuple[Lease, dict[str, Any]]], **shared: Any
+) -> set[Any]:
+    """
+    Write the final state of many leased rows in one fenced UPDATE ... FROM (VALUES ...).
+    Per-row values must share the same keys. Returns the ids that were written;
+    the rest have stale tokens.
+    """
+    if not entries:
+        return set()
+    keys = sorted(entries[0][1])
+    table = model.__table__
+    rows = values(
+        column("id", table.c.id.type),
+        column("token", Integer),
+        *[column(k, table.c[k].type) for k in keys],
+        name="v",
+    ).data([(lease.row.id, lease.token, *(vals[k] for k in keys)) for lease, vals in entries])
+    res = await session.execute(
+        update(model)
+        .where(model.id == rows.c.id, model.fencing_token == rows.c.token, model.status == JobStatus.running)
+        .values(lease_owner=None, lease_expires_at=None, **shared, **{k: rows.c[k] for k in keys})
+        .returning(model.id)
+        .execution_options(synchronize_session=False)
+    )
+    written = set(res.scalars().all())
+    await session.commit()
+    stale = len(entries) - len(written)
+    if stale:
+        registry.inc("lease_stale_writes_total", stale, model=model.__tablename__)
+    return written
+
+
+async def release(session: AsyncSession, lease: Lease) -> bool:
+    """Give the row back to the queue (e.g. before a retry or on shutdown)."""
+    return await _fenced_update(
+        session, lease, status=JobStatus.queued, lease_owner=None, lease_expires_at=None
+    )
+
+
+class LeaseKeeper:
+    """
+    Renews a lease every third of its duration while the body runs. If a
+    renewal is rejected the body is cancelled and StaleLeaseError is raised in
+    its place, so the worker stops duplicating someone else's work.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession], lease: Lease):
+        self.session_factory = session_factory
+        self.lease = lease
+        self.lost = False
+        self._owner: Optional[asyncio.Task] = None
+        self._renewer: Optional[asyncio.Task] = None
+
+    async def _renew_forever(self) -> None:
+        interval = max(1.0, self.lease.seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with self.session_factory() as session:
+                    ok = await renew(session, self.lease)
+            except Exception:
+                logger.warning("Lease renewal failed for %s; will retry", self.lease.row.id, exc_info=True)
+                continue
+            if not ok:
+                logger.warning("Lease lost for %s (token %s)", self.lease.row.id, self.lease.token)
+                self.lost = True
+                self._owner.cancel()
+                return
+
+    async def __aenter__(self) -> "LeaseKeeper":
+        self._owner = asyncio.current_task()
+        self._renewer = asyncio.create_task(self._renew_forever())
+        return self
+
+    async def stop(self) -> None:
+        """Stop renewing, e.g. just before the final write, so a renewal can't race it."""
+        self._renewer.cancel()
+        await asyncio.gather(self._renewer, return_exceptions=True)
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        await self.stop()
+        if self.lost and exc_type is asyncio.CancelledError:
+            self._owner.uncancel()
+            raise StaleLeaseError(f"lease lost for {self.lease.row.id}")
+        return False
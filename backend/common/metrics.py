@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import socket
+import threading
+import time
+from typing import Any, Iterable
+
+# Lightweight in-process metrics. Every process (API, workers) keeps its own
+# registry and periodically publishes a snapshot to Redis; the admin
+# observability API merges the published snapshots.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+METRICS_KEY_PREFIX = "metrics:"
+METRICS_SNAPSHOT_TTL_SECONDS = 60
+
+
+def metric_key(name: str, **labels: Any) -> str:
+    if not labels:
+        return name
+    inner = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{inner}}}"
+
+
+class Histogram:
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": list(self.buckets),
+            "counts": list(self.counts),
+        }
+
+
+def histogram_percentile(snap: dict[str, Any], q: float) -> float | None:
+    """Estimate the q-th percentile (0..1) from a histogram snapshot (bucket upper bound)."""
+    total = snap.get("count") or 0
+    if not total:
+        return None
+    target = q * total
+    seen = 0
+    buckets = snap["buckets"]
+    for i, c in enumerate(snap["counts"]):
+        seen += c
+        if seen >= target:
+            return buckets[i] if i < len(buckets) else float("inf")
+    return float("inf")
+
+
+def merge_histograms(snaps: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    out: dict[str, Any] | None = None
+    for s in snaps:
+        if out is None:
+            out = {"count": 0, "sum": 0.0, "buckets": list(s["buckets"]), "counts": [0] * len(s["counts"])}
+        if s["buckets"] != out["buckets"]:
+            continue
+        out["count"] += s["count"]
+        out["sum"] += s["sum"]
+        out["counts"] = [a + b for a, b in zip(out["counts"], s["counts"])]
+    return out or {"count": 0, "sum": 0.0, "buckets": [], "counts": [0]}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._histograms: dict[str, Histogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = metric_key(name, **labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        key = metric_key(name, **labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, buckets: Iterable[float] = DEFAULT_BUCKETS, **labels: Any) -> None:
+        key = metric_key(name, **labels)
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = Histogram(buckets)
+            h.observe(value)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "histograms": {k: h.snapshot() for k, h in self._histograms.items()},
+            }
+
+
+registry = MetricsRegistry()
+
+
+class timed:
+    """Context manager observing elapsed seconds into a histogram."""
+
+    def __init__(self, name: str, **labels: Any):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registry.observe(self.name, time.perf_counter() - self._start, **self.labels)
+        return False
+
+
+def process_source(kind: str) -> str:
+    return f"{kind}:{socket.gethostname()}:{os.getpid()}"
+
+
+async def publish_snapshot(redis_client, source: str) -> None:
+    await redis_client.set(
+        f"{METRICS_KEY_PREFIX}{source}",
+        json.dumps({"source": source, "ts": time.time(), **registry.snapshot()}),
+        ex=METRICS_SNAPSHOT_TTL_SECONDS,
+    )
+
+
+async def read_snapshots(redis_client) -> list[dict[str, Any]]:
+    keys = [k async for k in redis_client.scan_iter(match=f"{METRICS_KEY_PREFIX}*", count=200)]
+    if not keys:
+        return []
+    raws = await redis_client.mget(keys)
+    return [json.loads(r) for r in raws if r]
+
+
+def aggregate_snapshots(snaps: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    counters: dict[str, float] = {}
+    gauges: dict[str, float] = {}
+    hists: dict[str, list[dict[str, Any]]] = {}
+    for s in snaps:
+        for k, v in s.get("counters", {}).items():
+            counters[k] = counters.get(k, 0) + v
+        for k, v in s.get("gauges", {}).items():
+            gauges[k] = gauges.get(k, 0) + v
+        for k, v in s.get("histograms", {}).items():
+            hists.setdefault(k, []).append(v)
+    merged = {}
+    for k, v in hists.items():
+        h = merge_histograms(v)
+        merged[k] = {
+            "count": h["count"],
+            "sum": h["sum"],
+            "p50": histogram_percentile(h, 0.50),
+            "p90": histogram_percentile(h, 0.90),
+            "p99": histogram_percentile(h, 0.99),
+        }
+    return {"counters": counters, "gauges": gauges, "histograms": merged}
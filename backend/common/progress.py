@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Optional
+
+from backend.app.config import settings
+from backend.common.events import publish_job_event
+from backend.common.metrics import registry
+
+logger = logging.getLogger("hivesync.progress")
+
+# Job progress (percent, stage, ETA) for running jobs.
+#
+# Workers call ProgressReporter.update() as often as they like; updates are
+# coalesced in memory and written to progress:<kind>:<id> (plus a "progress"
+# job event) at most once per JOB_PROGRESS_FLUSH_INTERVAL_SECONDS, with a
+# trailing flush so the latest value always lands. Postgres only receives the
+# final snapshot, alongside the terminal status.
+
+
+def progress_key(kind: str, job_id: str) -> str:
+    return f"progress:{kind}:{job_id}"
+
+
+async def read_progress(redis_client, kind: str, job_id: str) -> Optional[dict[str, Any]]:
+    try:
+        raw = await redis_client.get(progress_key(kind, str(job_id)))
+    except Exception:
+        logger.warning("Failed to read progress for %s %s", kind, job_id, exc_info=True)
+        return None
+    return json.loads(raw) if raw else None
+
+
+class ProgressReporter:
+    def __init__(self, redis_client, kind: str, job_id: str, interval: Optional[float] = None):
+        self.redis = redis_client
+        self.kind = kind
+        self.job_id = str(job_id)
+        self.interval = settings.JOB_PROGRESS_FLUSH_INTERVAL_SECONDS if interval is None else interval
+        self.percent = 0.0
+        self.stage: Optional[str] = None
+        self._started = time.monotonic()
+        self._last_flush = float("-inf")
+        # update() bumps _version; a flush only counts once its write succeeded,
+        # so a flush cancelled mid-write is redone by close()
+        self._version = 0
+        self._flushed = 0
+        self._pending: Optional[asyncio.Task] = None
+
+    def snapshot(self) -> dict[str, Any]:
+        elapsed = time.monotonic() - self._started
+        eta = None
+        if self.percent >= 100:
+            eta = 0.0
+        elif self.percent >= 1:
+            # Linear extrapolation from the job's own rate so far
+            eta = round(elapsed * (100 - self.percent) / self.percent, 1)
+        return {
+            "percent": round(self.percent, 1),
+            "stage": self.stage,
+            "eta_seconds": eta,
+            "elapsed_seconds": round(elapsed, 1),
+            "updated_at": time.time(),
+        }
+
+    def update(self, percent: Optional[float] = None, stage: Optional[str] = None) -> None:
+        """Record progress; cheap enough to call from tight loops. Percent never goes backwards."""
+        if percent is not None:
+            self.percent = max(self.percent, min(100.0, float(percent)))
+        if stage is not None:
+            self.stage = stage
+        self._version += 1
+        registry.inc("job_progress_updates_total", kind=self.kind)
+        if self._pending is None:
+            delay = max(0.0, self._last_flush + self.interval - time.monotonic())
+            self._pending = asyncio.get_running_loop().create_task(self._flush_after(delay))
+
+    async def _flush_after(self, delay: float) -> None:
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._pending = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        version = self._version
+        if version == self._flushed:
+            return
+        self._last_flush = time.monotonic()
+        snap = self.snapshot()
+        try:
+            await self.redis.set(
+                progress_key(self.kind, self.job_id), json.dumps(snap), ex=settings.JOB_PROGRESS_TTL_SECONDS
+            )
+        except Exception:
+            logger.warning("Failed to write progress for %s %s", self.kind, self.job_id, exc_info=True)
+            return
+        self._flushed = max(self._flushed, version)
+        registry.inc("job_progress_flushes_total", kind=self.kind)
+        await publish_job_event(self.redis, self.kind, self.job_id, "progress", **snap)
+
+    def finish(self, stage: str = "done") -> dict[str, Any]:
+        """Final snapshot to persist with the terminal status."""
+        self.percent = 100.0
+        self.stage = stage
+        # Persisted with the row; nothing left for Redis
+        self._flushed = self._version
+        return self.snapshot()
+
+    async def close(self) -> None:
+        """Write any update still waiting on the timer. The Redis key is left to expire for late readers."""
+        task, self._pending = self._pending, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await self.flush()
+
+    async def __aenter__(self) -> "ProgressReporter":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
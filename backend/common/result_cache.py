@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Optional
+
+from backend.app.config import settings
+from backend.common.metrics import registry
+
+logger = logging.getLogger("hivesync.result_cache")
+
+# Content-addressed AI results. The key is a hash of the canonical inputs
+# (job_type, selection, project_id) plus the tenant scope (team, or user when
+# the job has no team), so identical submissions share a result only within
+# the tenant that computed it.
+#   airesult:<hash>   STRING result JSON, expires after AI_RESULT_CACHE_TTL_SECONDS
+#   airesult:index    ZSET hash -> stored at, used to evict the oldest entries
+# Every call fails open: a Redis problem is a miss, never an error.
+
+INDEX_KEY = "airesult:index"
+
+PUT_LUA = """
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[4])
+local excess = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[5])
+if excess > 0 then
+  local old = redis.call('ZPOPMIN', KEYS[2], excess)
+  for i = 1, #old, 2 do
+    redis.call('DEL', 'airesult:' .. old[i])
+  end
+  return excess
+end
+return 0
+"""
+
+
+def cache_scope(team_id: Any, user_id: Any) -> str:
+    return f"team:{team_id}" if team_id else f"user:{user_id}"
+
+
+def result_cache_key(scope: str, job_type: str, selection: Any, project_id: Any) -> str:
+    canonical = json.dumps(
+        {
+            "scope": scope,
+            "job_type": job_type,
+            "selection": selection or {},
+            "project_id": str(project_id) if project_id else None,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+async def get_result(client, key: str) -> Optional[dict[str, Any]]:
+    if not settings.AI_RESULT_CACHE_ENABLED:
+        return None
+    try:
+        raw = await client.get(f"airesult:{key}")
+    except Exception:
+        logger.warning("AI result cache lookup failed", exc_info=True)
+        raw = None
+    registry.inc("ai_result_cache_total", outcome="hit" if raw else "miss")
+    return json.loads(raw) if raw else None
+
+
+async def put_result(client, key: str, result: dict[str, Any]) -> None:
+    if not settings.AI_RESULT_CACHE_ENABLED:
+        return
+    try:
+        evicted = await client.eval(
+            PUT_LUA,
+            2,
+            f"airesult:{key}",
+            INDEX_KEY,
+            json.dumps(result, default=str),
+            settings.AI_RESULT_CACHE_TTL_SECONDS,
+            time.time(),
+            key,
+            settings.AI_RESULT_CACHE_MAX_ENTRIES,
+        )
+    except Exception:
+        logger.warning("AI result cache store failed", exc_info=True)
+        return
+    if evicted:
+        registry.inc("ai_result_cache_evictions_total", int(evicted))
+
+
+async def prune_index(client) -> int:
+    """Drop index entries whose results already expired by TTL."""
+    cutoff = time.time() - settings.AI_RESULT_CACHE_TTL_SECONDS
+    return await client.zremrangebyscore(INDEX_KEY, "-inf", cutoff)
+
+
+async def cache_size(client) -> int:
+    return await client.zcard(INDEX_KEY)
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import logging
+import random
+import time
+from dataclasses import dataclass
+
+from backend.app.config import settings
+from backend.common.metrics import registry
+
+logger = logging.getLogger("hivesync.retry_policy")
+
+# Retry policy for worker tasks.
+#
+# 1. Taxonomy: permanent errors (bad input, missing rows, constraint
+#    violations) go straight to the DLQ; everything else is presumed transient.
+# 2. Backoff: full-jitter exponential, so tasks that failed together during a
+#    shared outage don't come back together.
+# 3. Budget: per queue, every first delivery deposits RATIO tokens and every
+#    retry spends one. On top of that a small reserve (RESERVE tokens,
+#    refilled at MIN_PER_SECOND but never beyond RESERVE) lets low-volume
+#    queues retry a transient blip; at volume the ratio is the binding limit.
+#    An empty bucket sends failures to the DLQ instead of retrying.
+
+
+class PermanentError(Exception):
+    """Retrying cannot help; fail the task immediately."""
+
+
+class JobNotFound(PermanentError):
+    """The row a task refers to does not exist."""
+
+
+def _permanent_types() -> tuple[type[BaseException], ...]:
+    types: list[type[BaseException]] = [PermanentError, TypeError, KeyError, ValueError]
+    try:
+        from sqlalchemy.exc import DataError, IntegrityError, ProgrammingError
+
+        types += [DataError, IntegrityError, ProgrammingError]
+    except ImportError:  # pragma: no cover
+        pass
+    try:
+        from pydantic import ValidationError
+
+        types.append(ValidationError)
+    except ImportError:  # pragma: no cover
+        pass
+    return tuple(types)
+
+
+PERMANENT_ERRORS = _permanent_types()
+
+
+def is_permanent(exc: BaseException) -> bool:
+    return isinstance(exc, PERMANENT_ERRORS)
+
+
+# KEYS[1] budget hash; ARGV: op ('deposit'|'withdraw'), now, ratio, min_per_second, max_tokens, reserve
+BUDGET_LUA = """
+local now = tonumber(ARGV[2])
+local cap = tonumber(ARGV[5])
+local reserve = math.min(cap, tonumber(ARGV[6]))
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or reserve
+local ts = tonumber(state[2]) or now
+-- The time-based floor only tops up the reserve; anything above it is earned by deliveries
+if tokens < reserve then
+  tokens = math.min(reserve, tokens + math.max(0, now - ts) * tonumber(ARGV[4]))
+end
+local ok = 1
+if ARGV[1] == 'deposit' then
+  tokens = math.min(cap, tokens + tonumber(ARGV[3]))
+elseif tokens >= 0.999999 then
+  tokens = tokens - 1
+else
+  ok = 0
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], 3600)
+return ok
+"""
+
+
+@dataclass
+class RetryDecision:
+    retry: bool
+    delay: float
+    reason: str  # retry | permanent | exhausted | budget
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        queue: str,
+        *,
+        max_retries: int,
+        base_delay: float,
+        max_delay: float,
+        budget_ratio: float,
+        budget_min_per_second: float,
+        budget_max_tokens: float,
+        budget_reserve: float,
+    ):
+        self.queue = queue
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.budget_min_per_second = budget_min_per_second
+        self.budget_max_tokens = budget_max_tokens
+        self.budget_reserve = budget_reserve
+
+    @property
+    def _budget_key(self) -> str:
+        return f"retry_budget:{self.queue}"
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(max_delay, base * 2^(attempt-1))]."""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** max(0, attempt - 1)))
+        return random.uniform(0, ceiling)
+
+    async def _budget(self, redis_client, op: str) -> bool:
+        try:
+            ok = await redis_client.eval(
+                BUDGET_LUA,
+                1,
+                self._budget_key,
+                op,
+                time.time(),
+                self.budget_ratio,
+                self.budget_min_per_second,
+                self.budget_max_tokens,
+                self.budget_reserve,
+            )
+        except Exception:
+            # Fail open: without Redis we fall back to max_retries alone.
+            logger.warning("Retry budget unavailable for %s", self.queue, exc_info=True)
+            return True
+        return bool(ok)
+
+    async def deposit(self, redis_client) -> None:
+        """Call (and await) once per first delivery, before the task runs."""
+        await self._budget(redis_client, "deposit")
+
+    async def decide(self, redis_client, exc: BaseException, attempt: int) -> RetryDecision:
+        """attempt is 1-based: the number of the delivery that just failed."""
+        if is_permanent(exc):
+            decision = RetryDecision(False, 0.0, "permanent")
+        elif attempt > self.max_retries:
+            decision = RetryDecision(False, 0.0, "exhausted")
+        elif not await self._budget(redis_client, "withdraw"):
+            decision = RetryDecision(False, 0.0, "budget")
+        else:
+            decision = RetryDecision(True, self.backoff(attempt), "retry")
+        registry.inc("worker_retry_decisions_total", queue=self.queue, outcome=decision.reason)
+        return decision
+
+
+def policy_for(queue: str) -> RetryPolicy:
+    return RetryPolicy(
+        queue,
+        max_retries=settings.WORKER_MAX_RETRIES,
+        base_delay=settings.WORKER_RETRY_BASE_DELAY_SECONDS,
+        max_delay=settings.WORKER_RETRY_MAX_DELAY_SECONDS,
+        budget_ratio=settings.WORKER_RETRY_BUDGET_RATIO,
+        budget_min_per_second=settings.WORKER_RETRY_BUDGET_MIN_PER_SECOND,
+        budget_max_tokens=settings.WORKER_RETRY_BUDGET_MAX_TOKENS,
+        budget_reserve=settings.WORKER_RETRY_BUDGET_RESERVE_TOKENS,
+    )
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import logging
+import time
+
+logger = logging.getLogger("hivesync.throughput")
+
+# Cluster-wide task throughput per kind, in fixed Redis buckets:
+#   throughput:<kind>:<epoch // BUCKET_SECONDS>  INCR per finished delivery
+# Workers write; the API's admission controller reads the last few full buckets.
+
+BUCKET_SECONDS = 10
+BUCKET_TTL_SECONDS = 600
+
+
+def _bucket_key(kind: str, bucket: int) -> str:
+    return f"throughput:{kind}:{bucket}"
+
+
+async def record_throughput(redis_client, kind: str, n: int = 1) -> None:
+    key = _bucket_key(kind, int(time.time()) // BUCKET_SECONDS)
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.incrby(key, n)
+        pipe.expire(key, BUCKET_TTL_SECONDS)
+        await pipe.execute()
+    except Exception:
+        logger.warning("Failed to record %s throughput", kind, exc_info=True)
+
+
+async def read_throughput(redis_client, kind: str, window_seconds: int) -> float:
+    """Tasks per second over the last complete buckets covering window_seconds."""
+    n = max(1, window_seconds // BUCKET_SECONDS)
+    current = int(time.time()) // BUCKET_SECONDS
+    keys = [_bucket_key(kind, current - i) for i in range(1, n + 1)]
+    values = await redis_client.mget(keys)
+    return sum(int(v) for v in values if v) / (n * BUCKET_SECONDS)
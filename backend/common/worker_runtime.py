@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+import redis.asyncio as redis
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from backend.app.config import settings
+from backend.common.metrics import process_source, publish_snapshot
+
+logger = logging.getLogger("hivesync.worker_runtime")
+
+T = TypeVar("T")
+
+
+class WorkerRuntime:
+    """
+    One long-lived event loop per worker process, running in a daemon thread,
+    with the asyncpg pool and Redis client bound to it.
+
+    Celery tasks are synchronous; they hand coroutines to `run()` instead of
+    calling asyncio.run(), so every task reuses the same loop and warm
+    connections. State is created lazily and re-created after a fork, so the
+    prefork parent never hands its loop or sockets to a child.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._engine: Optional[AsyncEngine] = None
+        self._sessionmaker: Optional[async_sessionmaker[AsyncSession]] = None
+        self._redis: Optional[redis.Redis] = None
+        self._background: list[Callable[["WorkerRuntime"], Awaitable[Any]]] = []
+
+    def _ensure_started(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name=f"{self.kind}-runtime", daemon=True)
+            thread.start()
+
+            self._engine = create_async_engine(
+                settings.database_url,
+                pool_pre_ping=True,
+                pool_size=settings.WORKER_DB_POOL_SIZE,
+                max_overflow=settings.WORKER_DB_MAX_OVERFLOW,
+            )
+            self._sessionmaker = async_sessionmaker(self._engine, expire_on_commit=False, class_=AsyncSession)
+            self._redis = redis.from_url(settings.redis_url, decode_responses=True)
+            self._loop = loop
+            self._thread = thread
+            self._pid = os.getpid()
+
+            asyncio.run_coroutine_threadsafe(self._publish_metrics_forever(), loop)
+            for factory in self._background:
+                asyncio.run_coroutine_threadsafe(factory(self), loop)
+            logger.info("%s runtime started (pid=%s)", self.kind, self._pid)
+
+    def start(self) -> None:
+        """Start eagerly (e.g. from worker_process_init) so background tasks run while idle."""
+        self._ensure_started()
+
+    def add_background(self, factory: Callable[["WorkerRuntime"], Awaitable[Any]]) -> None:
+        """Run factory(runtime) on the loop for the life of every process that starts this runtime."""
+        self._background.append(factory)
+
+    @property
+    def started(self) -> bool:
+        return self._pid == os.getpid()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        self._ensure_started()
+        return self._loop
+
+    @property
+    def redis(self) -> redis.Redis:
+        self._ensure_started()
+        return self._redis
+
+    def session(self) -> AsyncSession:
+        self._ensure_started()
+        return self._sessionmaker()
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """Run a coroutine on the runtime loop and block the calling thread until it finishes."""
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def spawn(self, coro: Awaitable[Any]):
+        """Schedule a coroutine on the runtime loop without waiting for it."""
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def _publish_metrics_forever(self) -> None:
+        source = process_source(self.kind)
+        while True:
+            try:
+                await publish_snapshot(self._redis, source)
+            except Exception:
+                logger.warning("Failed to publish metrics snapshot", exc_info=True)
+            await asyncio.sleep(settings.METRICS_PUBLISH_INTERVAL_SECONDS)
+
+    def shutdown(self) -> None:
+        if self._pid != os.getpid() or self._loop is None:
+            return
+
+        async def _close():
+            await self._redis.aclose()
+            await self._engine.dispose()
+
+        try:
+            self.run(_close(), timeout=10)
+        except Exception:
+            logger.warning("%s runtime did not close cleanly", self.kind, exc_info=True)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._pid = None
+        self._loop = None
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import and_, or_, select
+
+from backend.app.config import settings
+from backend.app.db import AsyncSessionLocal, DeadLetter
+from backend.app.jobs import requeue_dead_letter
+from backend.app.outbox import relay as outbox_relay
+from backend.common.metrics import registry
+
+logger = logging.getLogger("hivesync.dlq_replay")
+
+# Bulk DLQ replay.
+#
+# A replay walks the matching DeadLetter rows oldest first and requeues each
+# one through a token bucket, so a post-incident backlog reaches the workers
+# at a bounded rate. Progress lives in Redis (dlq:replay:<id>) so any API
+# process can report it; the replay itself runs on the process that started it.
+
+REPLAY_KEY_TTL_SECONDS = 7 * 86400
+BATCH_SIZE = 100
+
+
+def replay_key(replay_id: str) -> str:
+    return f"dlq:replay:{replay_id}"
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class ReplayFilter:
+    queue: Optional[str] = None
+    task_name: Optional[str] = None
+    error_type: Optional[str] = None
+    fingerprint: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    include_requeued: bool = False
+
+    def clauses(self) -> list[Any]:
+        out = []
+        if self.queue:
+            out.append(DeadLetter.queue == self.queue)
+        if self.task_name:
+            out.append(DeadLetter.task_name == self.task_name)
+        if self.error_type:
+            out.append(DeadLetter.error_type == self.error_type)
+        if self.fingerprint:
+            out.append(DeadLetter.fingerprint == self.fingerprint)
+        if self.since:
+            out.append(DeadLetter.created_at >= self.since)
+        if self.until:
+            out.append(DeadLetter.created_at < self.until)
+        if not self.include_requeued:
+            out.append(DeadLetter.requeued_at.is_(None))
+        return out
+
+
+class DLQReplayer:
+    def __init__(self):
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    async def start(self, redis_client, flt: ReplayFilter, *, total: int, rate: float, limit: int) -> str:
+        replay_id = uuid.uuid4().hex
+        await redis_client.hset(
+            replay_key(replay_id),
+            mapping={
+                "state": "running",
+                "total": min(total, limit),
+                "requeued": 0,
+                "skipped": 0,
+                "failed": 0,
+                "rate_per_second": rate,
+                "filter": json.dumps(asdict(flt), default=str),
+                "started_at": time.time(),
+                "updated_at": time.time(),
+            },
+        )
+        await redis_client.expire(replay_key(replay_id), REPLAY_KEY_TTL_SECONDS)
+        task = asyncio.create_task(self._run(redis_client, replay_id, flt, rate, limit))
+        self._tasks[replay_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(replay_id, None))
+        return replay_id
+
+    def stop(self, replay_id: str) -> bool:
+        task = self._tasks.get(replay_id)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    async def stop_all(self) -> None:
+        tasks = list(self._tasks.values())
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, redis_client, replay_id: str, flt: ReplayFilter, rate: float, limit: int) -> None:
+        key = replay_key(replay_id)
+        bucket = TokenBucket(rate, settings.DLQ_REPLAY_BURST)
+        cursor: Optional[tuple[datetime, uuid.UUID]] = None
+        processed = 0
+        state = "completed"
+        try:
+            while processed < limit:
+                async with AsyncSessionLocal() as db:
+                    q = select(DeadLetter).where(*flt.clauses())
+                    if cursor:
+                        q = q.where(
+                            or_(
+                                DeadLetter.created_at > cursor[0],
+                                and_(DeadLetter.created_at == cursor[0], DeadLetter.id > cursor[1]),
+                            )
+                        )
+                    res = await db.execute(
+                        q.order_by(DeadLetter.created_at, DeadLetter.id).limit(min(BATCH_SIZE, limit - processed))
+                    )
+                    rows = res.scalars().all()
+                    if not rows:
+                        break
+                    for dl in rows:
+                        await bucket.acquire()
+                        cursor = (dl.created_at, dl.id)
+                        try:
+                            outcome = "requeued" if await requeue_dead_letter(db, dl) else "skipped"
+                        except Exception:
+                            logger.warning("DLQ replay %s failed on %s", replay_id, cursor[1], exc_info=True)
+                            await db.rollback()
+                            outcome = "failed"
+                        processed += 1
+                        registry.inc("dlq_replayed_total", outcome=outcome)
+                        await redis_client.hincrby(key, outcome, 1)
+                        await redis_client.hset(key, "updated_at", time.time())
+                        outbox_relay.notify()
+                        if outcome == "failed":
+                            # Rollback expired the batch; re-read from the cursor
+                            break
+        except asyncio.CancelledError:
+            state = "stopped"
+            raise
+        except Exception:
+            logger.exception("DLQ replay %s aborted", replay_id)
+            state = "aborted"
+        finally:
+            await redis_client.hset(key, mapping={"state": state, "finished_at": time.time()})
+
+    async def progress(self, redis_client, replay_id: str) -> Optional[dict[str, Any]]:
+        raw = await redis_client.hgetall(replay_key(replay_id))
+        if not raw:
+            return None
+        out: dict[str, Any] = dict(raw)
+        for k in ("total", "requeued", "skipped", "failed"):
+            out[k] = int(out.get(k, 0))
+        out["filter"] = json.loads(out.get("filter") or "{}")
+        done = out["requeued"] + out["skipped"] + out["failed"]
+        out["processed"] = done
+        out["percent"] = round(100.0 * done / out["total"], 1) if out["total"] else 100.0
+        rate = float(out.get("rate_per_second") or 0)
+        if out["state"] == "running" and rate > 0:
+            out["eta_seconds"] = round((out["total"] - done) / rate, 1)
+        out["replay_id"] = replay_id
+        return out
+
+
+replayer = DLQReplayer()
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi import Query
 from pydantic import BaseModel, Field
 from sqlalchemy import select, func
@@ -21,8 +21,14 @@ from backend.app.db import (
     AuditLog,
     DeadLetter,
 )
+from backend.app.jobs import requeue_dead_letter as requeue_dead_letter_row
+from backend.app.outbox import relay as outbox_relay
 from backend.app.routers import get_current_user
-from backend.app.celery_app import TASK_AI_JOB_RUN, TASK_PREVIEW_REQUEST, celery_app
+from backend.common.metrics import aggregate_snapshots, metric_key, read_snapshots, registry
+from backend.common.heartbeat import read_alive
+from backend.common.lanes import lane_queue, tier_slo_seconds, tier_weight
+from backend.common.result_cache import cache_size
+from backend.observability_admin.replay import ReplayFilter, replayer
 
 
 router = APIRouter(prefix="/admin/observability", tags=["admin-observability"])
@@ -173,33 +179,53 @@ async def list_ai_jobs(
 
 
 class WorkerOut(BaseModel):
-    id: uuid.UUID
+    id: Optional[uuid.UUID]
     worker_id: str
     kind: str
+    alive: bool
     last_heartbeat_at: datetime
     metadata: dict
 
 
 @router.get("/workers", response_model=list[WorkerOut])
 async def list_workers(
+    request: Request,
     user: User = Depends(get_current_user),
     db=Depends(get_db),
 ):
     require_admin(user)
 
+    # Liveness is authoritative in Redis; Postgres holds the (periodically
+    # upserted) history, including workers that have since died.
+    beats = {b["worker_id"]: b for b in await read_alive(request.app.state.redis)}
     res = await db.execute(select(Worker).order_by(Worker.last_heartbeat_at.desc()))
-    workers = res.scalars().all()
-
-    return [
-        WorkerOut(
-            id=w.id,
-            worker_id=w.worker_id,
-            kind=w.kind,
-            last_heartbeat_at=w.last_heartbeat_at,
-            metadata=w.metadata,
+    out = []
+    for w in res.scalars().all():
+        beat = beats.pop(w.worker_id, None)
+        out.append(
+            WorkerOut(
+                id=w.id,
+                worker_id=w.worker_id,
+                kind=w.kind,
+                alive=beat is not None,
+                last_heartbeat_at=datetime.fromtimestamp(beat["last_beat"], tz=timezone.utc) if beat else w.last_heartbeat_at,
+                metadata=beat or w.metadata_ or {},
+            )
         )
-        for w in workers
-    ]
+    # Live but not yet persisted by the recovery sweep
+    for beat in beats.values():
+        out.append(
+            WorkerOut(
+                id=None,
+                worker_id=beat["worker_id"],
+                kind=beat["kind"],
+                alive=True,
+                last_heartbeat_at=datetime.fromtimestamp(beat["last_beat"], tz=timezone.utc),
+                metadata=beat,
+            )
+        )
+    out.sort(key=lambda w: (not w.alive, -w.last_heartbeat_at.timestamp()))
+    return out
 
 
 class AuditLogOut(BaseModel):
@@ -240,6 +266,76 @@ async def list_audit_logs(
     ]
 
 
+# -----------------------------
+# Metrics
+# -----------------------------
+
+@router.get("/metrics")
+async def metrics(
+    request: Request,
+    user: User = Depends(get_current_user),
+):
+    require_admin(user)
+
+    snaps = await read_snapshots(request.app.state.redis)
+    return {
+        "sources": sorted(s["source"] for s in snaps),
+        "aggregate": aggregate_snapshots(snaps),
+        "this_process": aggregate_snapshots([registry.snapshot()]),
+    }
+
+
+@router.get("/ai-result-cache")
+async def ai_result_cache_stats(
+    request: Request,
+    user: User = Depends(get_current_user),
+):
+    require_admin(user)
+
+    r = request.app.state.redis
+    counters = aggregate_snapshots(await read_snapshots(r))["counters"]
+    hits = counters.get(metric_key("ai_result_cache_total", outcome="hit"), 0)
+    misses = counters.get(metric_key("ai_result_cache_total", outcome="miss"), 0)
+    lookups = hits + misses
+    return {
+        "enabled": settings.AI_RESULT_CACHE_ENABLED,
+        "entries": await cache_size(r),
+        "max_entries": settings.AI_RESULT_CACHE_MAX_ENTRIES,
+        "ttl_seconds": settings.AI_RESULT_CACHE_TTL_SECONDS,
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / lookups if lookups else None,
+        "evictions": counters.get("ai_result_cache_evictions_total", 0),
+    }
+
+
+@router.get("/queues")
+async def queue_lanes(
+    request: Request,
+    user: User = Depends(get_current_user),
+):
+    require_admin(user)
+
+    r = request.app.state.redis
+    agg = aggregate_snapshots(await read_snapshots(r))
+    out = {}
+    for kind, base in (("preview", settings.WORKER_PREVIEW_QUEUE), ("ai", settings.WORKER_AI_QUEUE)):
+        lanes = {}
+        for tier in Tier:
+            labels = {"kind": kind, "tier": tier.value}
+            lanes[tier.value] = {
+                "queue": lane_queue(base, tier),
+                "depth": await r.llen(lane_queue(base, tier)),
+                "weight": tier_weight(tier),
+                "slo_seconds": tier_slo_seconds(tier),
+                "wait": agg["histograms"].get(metric_key("queue_wait_seconds", **labels)),
+                "slo_breaches": agg["counters"].get(metric_key("queue_slo_breaches_total", **labels), 0),
+                "expired": agg["counters"].get(metric_key("tasks_expired_total", **labels), 0),
+            }
+        out[kind] = {"base_queue_depth": await r.llen(base), "lanes": lanes}
+    return out
+
+
 # -----------------------------
 # DLQ
 # -----------------------------
@@ -254,18 +350,24 @@ class DeadLetterOut(BaseModel):
     payload: dict
     preview_id: Optional[str]
     ai_job_id: Optional[uuid.UUID]
+    fingerprint: Optional[str]
     created_at: datetime
+    requeued_at: Optional[datetime]
 
 
 @router.get("/dlq", response_model=list[DeadLetterOut])
 async def list_dead_letters(
     limit: int = Query(100, ge=1, le=1000),
+    fingerprint: Optional[str] = Query(None),
     user: User = Depends(get_current_user),
     db=Depends(get_db),
 ):
     require_admin(user)
 
-    res = await db.execute(select(DeadLetter).order_by(DeadLetter.created_at.desc()).limit(limit))
+    q = select(DeadLetter).order_by(DeadLetter.created_at.desc()).limit(limit)
+    if fingerprint:
+        q = q.where(DeadLetter.fingerprint == fingerprint)
+    res = await db.execute(q)
     rows = res.scalars().all()
     return [
         DeadLetterOut(
@@ -278,12 +380,120 @@ async def list_dead_letters(
             payload=r.payload,
             preview_id=r.preview_id,
             ai_job_id=r.ai_job_id,
+            fingerprint=r.fingerprint,
             created_at=r.created_at,
+            requeued_at=r.requeued_at,
         )
         for r in rows
     ]
 
 
+class DeadLetterGroupOut(BaseModel):
+    fingerprint: Optional[str]
+    task_name: str
+    queue: str
+    error_type: str
+    sample_message: str
+    count: int
+    pending: int
+    first_seen: datetime
+    last_seen: datetime
+
+
+@router.get("/dlq/groups", response_model=list[DeadLetterGroupOut])
+async def group_dead_letters(
+    since_minutes: int = Query(1440, ge=1, le=43200),
+    limit: int = Query(100, ge=1, le=1000),
+    user: User = Depends(get_current_user),
+    db=Depends(get_db),
+):
+    require_admin(user)
+
+    count = func.count(DeadLetter.id)
+    res = await db.execute(
+        select(
+            DeadLetter.fingerprint,
+            DeadLetter.task_name,
+            DeadLetter.queue,
+            DeadLetter.error_type,
+            func.max(DeadLetter.error_message).label("sample_message"),
+            count.label("count"),
+            func.count(DeadLetter.id).filter(DeadLetter.requeued_at.is_(None)).label("pending"),
+            func.min(DeadLetter.created_at).label("first_seen"),
+            func.max(DeadLetter.created_at).label("last_seen"),
+        )
+        .where(DeadLetter.created_at >= datetime.utcnow() - timedelta(minutes=since_minutes))
+        .group_by(DeadLetter.fingerprint, DeadLetter.task_name, DeadLetter.queue, DeadLetter.error_type)
+        .order_by(count.desc())
+        .limit(limit)
+    )
+    return [DeadLetterGroupOut(**row._mapping) for row in res.all()]
+
+
+class BulkRequeueIn(BaseModel):
+    queue: Optional[str] = None
+    task_name: Optional[str] = None
+    error_type: Optional[str] = None
+    fingerprint: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    include_requeued: bool = False
+    rate_per_second: float = Field(default_factory=lambda: settings.DLQ_REPLAY_RATE_PER_SECOND, gt=0, le=1000)
+    limit: int = Field(default_factory=lambda: settings.DLQ_REPLAY_MAX_ENTRIES, ge=1)
+
+
+@router.post("/dlq/requeue", status_code=status.HTTP_202_ACCEPTED)
+async def bulk_requeue_dead_letters(
+    data: BulkRequeueIn,
+    request: Request,
+    user: User = Depends(get_current_user),
+    db=Depends(get_db),
+):
+    require_admin(user)
+
+    flt = ReplayFilter(
+        queue=data.queue,
+        task_name=data.task_name,
+        error_type=data.error_type,
+        fingerprint=data.fingerprint,
+        since=data.since,
+        until=data.until,
+        include_requeued=data.include_requeued,
+    )
+    total = (await db.execute(select(func.count()).select_from(DeadLetter).where(*flt.clauses()))).scalar_one()
+    limit = min(data.limit, settings.DLQ_REPLAY_MAX_ENTRIES)
+    r = request.app.state.redis
+    replay_id = await replayer.start(r, flt, total=total, rate=data.rate_per_second, limit=limit)
+    return await replayer.progress(r, replay_id)
+
+
+@router.get("/dlq/replays/{replay_id}")
+async def dlq_replay_progress(
+    replay_id: str,
+    request: Request,
+    user: User = Depends(get_current_user),
+):
+    require_admin(user)
+
+    progress = await replayer.progress(request.app.state.redis, replay_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Replay not found")
+    return progress
+
+
+@router.delete("/dlq/replays/{replay_id}")
+async def stop_dlq_replay(
+    replay_id: str,
+    request: Request,
+    user: User = Depends(get_current_user),
+):
+    require_admin(user)
+
+    if not replayer.stop(replay_id):
+        raise HTTPException(status_code=404, detail="Replay is not running on this instance")
+    return {"ok": True, "replay_id": replay_id}
+
+
 @router.post("/dlq/{dlq_id}/requeue")
 async def requeue_dead_letter(
     dlq_id: uuid.UUID,
@@ -297,11 +507,9 @@ async def requeue_dead_letter(
     if not dl:
         raise HTTPException(status_code=404, detail="DLQ entry not found")
 
-    # Requeue the original task with original payload onto its original queue
-    celery_app.send_task(
-        dl.task_name,
-        kwargs=dl.payload,
-        queue=dl.queue,
-    )
+    # Reset the failed job and enqueue a fresh task via the outbox
+    if not await requeue_dead_letter_row(db, dl):
+        raise HTTPException(status_code=409, detail="Job no longer exists or is no longer failed")
+    outbox_relay.notify()
 
     return {"ok": True, "requeued_task": dl.task_name, "queue": dl.queue, "dlq_id": str(dl.id)}
@@ -7,13 +7,25 @@ from datetime import datetime, timezone
 from typing import Any
 
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown, worker_ready
 from celery.exceptions import Retry
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.app.config import settings
 from backend.app.db import PreviewSession, JobStatus
+from backend.common.cancellation import CancellationWatcher, JobCancelled
+from backend.common.deadlines import DEADLINE_ERROR, expire_job, is_expired, record_expired
 from backend.common.dlq import write_dead_letter
+from backend.common.heartbeat import HeartbeatPublisher
+from backend.common.lanes import lane_queues, observe_queue_wait
+from backend.common.events import PREVIEW, publish_job_event
+from backend.common.leases import LeaseKeeper, StaleLeaseError, claim, complete, release
+from backend.common.metrics import registry, timed
+from backend.common.progress import ProgressReporter, read_progress
+from backend.common.retry_policy import JobNotFound, policy_for
+from backend.common.throughput import record_throughput
+from backend.common.worker_runtime import WorkerRuntime
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("hivesync.preview_worker")
@@ -30,20 +42,47 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    # Tier lanes, dequeued by weighted fair order (see common/lanes.py)
+    task_queues=lane_queues(settings.WORKER_PREVIEW_QUEUE),
+    broker_transport_options={"queue_order_strategy": "backend.common.lanes:WeightedLaneCycle"},
 )
 
-engine = create_async_engine(settings.database_url, pool_pre_ping=True)
-SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+# One event loop + warm DB/Redis pools per worker process (see WorkerRuntime)
+runtime = WorkerRuntime("preview")
+
+# Interrupts running jobs when their owner cancels them (see common/cancellation.py)
+cancellations = CancellationWatcher(PREVIEW)
+runtime.add_background(lambda rt: cancellations.run_forever(rt.redis))
 
 WORKER_ID = f"preview-{uuid.uuid4()}"
-MAX_RETRIES = 3
-RETRY_DELAYS_SECONDS = [5, 20, 60]  # deterministic backoff
+
+heartbeats = HeartbeatPublisher("preview", WORKER_ID)
+runtime.add_background(lambda rt: heartbeats.run_forever(rt.redis))
+retry_policy = policy_for(settings.WORKER_PREVIEW_QUEUE)
 
 
 def utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
+@worker_process_init.connect
+def _start_runtime(**_: Any) -> None:
+    # Prefork child: start now so heartbeats flow while idle
+    runtime.start()
+
+
+@worker_ready.connect
+def _start_runtime_inline(sender=None, **_: Any) -> None:
+    # threads/solo pools run tasks in the main process
+    if "prefork" not in type(getattr(sender, "pool", None)).__module__:
+        runtime.start()
+
+
+@worker_process_shutdown.connect
+def _shutdown_runtime(**_: Any) -> None:
+    runtime.shutdown()
+
+
 @celery_app.task(name="hivesync.preview.request", bind=True, acks_late=True)
 def run_preview(self, **payload: Any):
     preview_id = payload.get("preview_id")
@@ -51,19 +90,41 @@ def run_preview(self, **payload: Any):
         logger.error("Missing preview_id in payload")
         return
 
+    if not self.request.retries:
+        observe_queue_wait("preview", payload)
+        # Awaited, so this delivery's own failure can spend what it earned
+        runtime.run(retry_policy.deposit(runtime.redis))
+
+    if is_expired(payload):
+        # Past its deadline (or its token expired): don't claim, don't run, don't retry
+        record_expired("preview", payload)
+        runtime.spawn(record_throughput(runtime.redis, "preview"))
+        logger.info("Preview %s missed its deadline (%s); dropping", preview_id, payload.get("deadline_at"))
+        runtime.run(_expire_preview(preview_id))
+        return
+
     try:
-        asyncio.run(_run_preview_async(preview_id, payload))
+        with timed("worker_task_seconds", task="hivesync.preview.request"):
+            runtime.run(_run_preview_async(preview_id, payload))
+    except StaleLeaseError:
+        logger.warning("Preview %s was claimed by another worker; dropping this delivery", preview_id)
+        return
+    except JobCancelled:
+        logger.info("Preview %s cancelled while running; slot released", preview_id)
     except Exception as exc:
-        # Retry unless this was the last attempt
+        # Retry transient errors while the policy and the queue's retry budget allow
         attempt = int(getattr(self.request, "retries", 0)) + 1
-        if attempt <= MAX_RETRIES:
-            delay = RETRY_DELAYS_SECONDS[min(attempt - 1, len(RETRY_DELAYS_SECONDS) - 1)]
-            logger.exception("Preview %s failed (attempt %s/%s), retrying in %ss", preview_id, attempt, MAX_RETRIES, delay)
-            raise self.retry(exc=exc, countdown=delay, max_retries=MAX_RETRIES)
+        decision = runtime.run(retry_policy.decide(runtime.redis, exc, attempt))
+        if decision.retry:
+            logger.exception(
+                "Preview %s failed (attempt %s/%s), retrying in %.1fs",
+                preview_id, attempt, retry_policy.max_retries, decision.delay,
+            )
+            raise self.retry(exc=exc, countdown=decision.delay, max_retries=retry_policy.max_retries)
 
         # Final failure -> DLQ + mark failed
-        logger.exception("Preview %s failed permanently after %s attempts", preview_id, attempt)
-        asyncio.run(_final_fail_to_dlq(preview_id, payload, exc, attempts=attempt))
+        logger.exception("Preview %s failed after %s attempts (%s); sending to DLQ", preview_id, attempt, decision.reason)
+        runtime.run(_final_fail_to_dlq(preview_id, payload, exc, attempts=attempt))
         # Also emit to DLQ queue (optional consumer)
         celery_app.send_task(
             "hivesync.dlq.recorded",
@@ -71,38 +132,73 @@ def run_preview(self, **payload: Any):
             queue=settings.WORKER_DLQ_QUEUE,
         )
 
+    # Feeds the API's admission estimate (backlog / throughput). Only outcomes
+    # that take the job off the queue count; retries and requeues don't.
+    runtime.spawn(record_throughput(runtime.redis, "preview"))
 
-async def _run_preview_async(preview_id: str, payload: dict[str, Any]):
-    async with SessionLocal() as session:
-        ps = await _get_preview_session(session, preview_id)
-        if not ps:
-            raise RuntimeError(f"PreviewSession not found: {preview_id}")
 
-        # idempotence: if already succeeded/failed, don't redo
-        if ps.status in {JobStatus.succeeded, JobStatus.failed, JobStatus.cancelled}:
-            logger.info("Preview %s already terminal (%s); skipping", preview_id, ps.status)
+async def _run_preview_async(preview_id: str, payload: dict[str, Any]):
+    async with runtime.session() as session:
+        lease = await claim(
+            session,
+            PreviewSession,
+            PreviewSession.preview_id == preview_id,
+            owner=WORKER_ID,
+            seconds=settings.PREVIEW_JOB_LEASE_SECONDS,
+        )
+        if lease is None:
+            ps = await _get_preview_session(session, preview_id)
+            if not ps:
+                raise JobNotFound(f"PreviewSession not found: {preview_id}")
+            # idempotence: terminal (incl. superseded), or another worker holds a live lease
+            logger.info("Preview %s not claimable (%s); skipping", preview_id, ps.status)
+            registry.inc("preview_skipped_total", status=ps.status.value)
             return
+    await publish_job_event(runtime.redis, PREVIEW, preview_id, "status", status=JobStatus.running.value)
 
-        ps.status = JobStatus.running
-        await session.commit()
-
-        # Replace these sleeps with real preview build/stream logic later
-        await asyncio.sleep(1)
-        await asyncio.sleep(1)
-
-        ps.status = JobStatus.succeeded
-        ps.completed_at = utcnow()
-        await session.commit()
+    try:
+        async with (
+            LeaseKeeper(runtime.session, lease),
+            cancellations.watch(runtime.redis, preview_id),
+            ProgressReporter(runtime.redis, PREVIEW, preview_id) as progress,
+        ):
+            # Replace these sleeps with real preview build/stream logic later
+            progress.update(0, stage="building")
+            await asyncio.sleep(1)
+            progress.update(50, stage="streaming")
+            await cancellations.checkpoint(runtime.redis, preview_id)
+            await asyncio.sleep(1)
+    except (Exception, asyncio.CancelledError) as exc:
+        if not isinstance(exc, (StaleLeaseError, JobCancelled)):
+            # Hand the row back so a retry or redelivery can claim it.
+            async with runtime.session() as session:
+                if await release(session, lease):
+                    await publish_job_event(runtime.redis, PREVIEW, preview_id, "status", status=JobStatus.queued.value)
+        raise
+
+    async with runtime.session() as session:
+        await complete(session, lease, status=JobStatus.succeeded, completed_at=utcnow(), progress=progress.finish())
+    await publish_job_event(runtime.redis, PREVIEW, preview_id, "status", status=JobStatus.succeeded.value)
+
+
+async def _expire_preview(preview_id: str) -> None:
+    async with runtime.session() as session:
+        if await expire_job(session, PreviewSession, PreviewSession.preview_id == preview_id):
+            await publish_job_event(
+                runtime.redis, PREVIEW, preview_id, "status", status=JobStatus.failed.value, error=DEADLINE_ERROR
+            )
 
 
 async def _final_fail_to_dlq(preview_id: str, payload: dict[str, Any], exc: Exception, attempts: int) -> None:
-    async with SessionLocal() as session:
+    async with runtime.session() as session:
         ps = await _get_preview_session(session, preview_id)
-        if ps:
+        if ps and ps.status in {JobStatus.queued, JobStatus.running}:
             ps.status = JobStatus.failed
             ps.error = f"{type(exc).__name__}: {exc}"
             ps.completed_at = utcnow()
+            ps.progress = await read_progress(runtime.redis, PREVIEW, preview_id)
             await session.commit()
+            await publish_job_event(runtime.redis, PREVIEW, preview_id, "status", status=JobStatus.failed.value, error=ps.error)
 
         await write_dead_letter(
             session,